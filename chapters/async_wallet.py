@@ -0,0 +1,183 @@
+# This module contains a class AsyncWallet that lets asyncio code spend and
+# earn cash in a Wallet, settling many pending requests in one pass.
+
+import asyncio
+from itertools import groupby
+from operator import itemgetter
+
+from wallet import Wallet
+
+# subclasses may apply part of a try_buy_many before raising, see _settle
+_TRY_BUY_MANY = Wallet.try_buy_many
+
+
+class AsyncWallet:
+    """An asyncio front-end to a Wallet that coalesces requests.
+
+    Calls to `buy_item` and `sell_item` are queued and return a future to
+    await. The first call in an event-loop tick schedules a single settle step,
+    which applies every request queued during that tick in order and wakes up
+    each awaiting caller. On a plain Wallet, consecutive purchases are settled
+    together with one `Wallet.try_buy_many` call; subclasses get one `try_buy`
+    per purchase. An InsufficientCashError is only built for the purchases
+    that fail, and any other error only reaches the caller that caused it.
+
+    Parameters
+    ----------
+    balance : number or Wallet
+        Amount of starting cash, or an existing Wallet to wrap.
+
+    Attributes
+    ----------
+    item : str
+        The type of item, an "AsyncWallet"
+    wallet : Wallet
+        The wallet that requests are applied to.
+    """
+
+    item = "AsyncWallet"
+
+    def __init__(self, balance):
+        """See help(AsyncWallet)"""
+        self.wallet = balance if isinstance(balance, Wallet) else Wallet(balance)
+        self._pending = []
+
+    @property
+    def balance(self):
+        """The amount of money currently in the wallet."""
+        return self.wallet.balance
+
+    def __str__(self):
+        return f"An AsyncWallet with balance {self.balance}"
+
+    def buy_item(self, cost, number=1):
+        """Spend money and reduce your balance, see `Wallet.buy_item`.
+
+        Returns
+        -------
+        asyncio.Future
+            Resolves to None once the purchase is settled.
+
+        Raises
+        ------
+        InsufficientCashError
+            If you do not have enough money to spend when the request is
+            settled.
+        """
+        return self._submit(True, cost, number)
+
+    def sell_item(self, cost, number=1):
+        """Sell items and increase your balance, see `Wallet.sell_item`.
+
+        Returns
+        -------
+        asyncio.Future
+            Resolves to None once the sale is settled.
+        """
+        return self._submit(False, cost, number)
+
+    def _submit(self, is_buy, cost, number):
+        """Queue a request and return the future it will be settled on."""
+        loop = asyncio.get_running_loop()
+        if not self._pending:
+            loop.call_soon(self._settle)
+        future = loop.create_future()
+        self._pending.append((is_buy, cost, number, future))
+        return future
+
+    def _settle(self):
+        """Apply every queued request in order and resolve its future."""
+        pending, self._pending = self._pending, []
+        pending = [request for request in pending if not request[3].cancelled()]
+        for is_buy, run in groupby(pending, key=itemgetter(0)):
+            run = list(run)
+            if is_buy and type(self.wallet).try_buy_many is _TRY_BUY_MANY:
+                try:
+                    results = self.wallet.try_buy_many(
+                        [(cost, number) for _, cost, number, _ in run]
+                    )
+                except Exception:
+                    # Wallet.try_buy_many only stores the balance at the end,
+                    # so nothing was applied; find the bad request one by one
+                    self._settle_each(run)
+                    continue
+                for (*_, future), rejection in zip(run, results):
+                    if rejection is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(rejection.error())
+            else:
+                self._settle_each(run)
+
+    def _settle_each(self, run):
+        """Apply requests one at a time, so an error only reaches its caller."""
+        for is_buy, cost, number, future in run:
+            try:
+                if is_buy:
+                    rejection = self.wallet.try_buy(cost, number)
+                else:
+                    rejection = self.wallet.sell_item(cost, number)
+            except Exception as error:
+                future.set_exception(error)
+            else:
+                if rejection is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(rejection.error())
+
+
+if __name__ == "__main__":
+    import time
+
+    from wallet import InsufficientCashError
+    from wallet_limits import LimitedWallet
+
+    async def task_per_call(n_ops, cost):
+        wallet = Wallet(n_ops)
+
+        async def buy(cost):
+            wallet.buy_item(cost)
+
+        await asyncio.gather(*(buy(cost) for _ in range(n_ops)), return_exceptions=True)
+
+    async def coalesced(n_ops, cost):
+        wallet = AsyncWallet(n_ops)
+        calls = (wallet.buy_item(cost) for _ in range(n_ops))
+        await asyncio.gather(*calls, return_exceptions=True)
+
+    async def rejected():
+        wallet = AsyncWallet(10)
+        results = await asyncio.gather(
+            wallet.buy_item(6),
+            wallet.buy_item(6),
+            wallet.sell_item(3),
+            return_exceptions=True,
+        )
+        assert results[0] is None
+        assert isinstance(results[1], InsufficientCashError)
+        assert wallet.balance == 7
+
+    async def bad_request(wallet):
+        wallet = AsyncWallet(wallet)
+        results = await asyncio.gather(
+            wallet.buy_item(3),
+            wallet.buy_item("x"),
+            wallet.buy_item(2),
+            return_exceptions=True,
+        )
+        assert results[0] is None and results[2] is None
+        assert isinstance(results[1], TypeError)
+        assert wallet.balance == 5
+
+    asyncio.run(rejected())
+    asyncio.run(bad_request(Wallet(10)))
+    asyncio.run(bad_request(LimitedWallet(10, limit=100)))
+    n_ops = 200_000
+    runs = [("task per call", task_per_call), ("coalesced", coalesced)]
+    # cost 1 always succeeds, cost 2 fails for the second half of the calls
+    for cost in (1, 2):
+        for name, func in runs:
+            tic = time.perf_counter()
+            asyncio.run(func(n_ops, cost))
+            elapsed = time.perf_counter() - tic
+            print(f"cost {cost}, {name}: {n_ops / elapsed:,.0f} ops/s")
@@ -0,0 +1,122 @@
+# This module contains a class CompactWallet, a Wallet that stores its balance
+# as an integer number of cents in a __slots__ attribute.
+
+from wallet import InsufficientCashError
+
+
+def to_cents(amount):
+    """Convert an amount of money to a whole number of cents.
+
+    Parameters
+    ----------
+    amount : number
+        Amount of money in dollars, e.g. 12.34.
+
+    Returns
+    -------
+    int
+        The amount in cents, rounded to the nearest cent, e.g. 1234.
+    """
+    return round(amount * 100)
+
+
+def format_cents(cents):
+    """Format a number of cents as dollars, e.g. 1234 -> "12.34"."""
+    sign = "-" if cents < 0 else ""
+    dollars, cents = divmod(abs(cents), 100)
+    return f"{sign}{dollars}.{cents:02d}"
+
+
+class CompactWallet:
+    """A wallet that can store, spend, and earn cash, counted in whole cents.
+
+    Balances are kept as integers, so repeated purchases never drift the way
+    float balances can, and `__slots__` removes the per-instance `__dict__`.
+
+    Parameters
+    ----------
+    balance : number
+        Amount of starting cash in dollars.
+
+    Attributes
+    ----------
+    item : str
+        The type of item, a "Wallet"
+    cents : int
+        The amount of money currently in the wallet, in cents.
+    """
+
+    __slots__ = ("cents",)
+    item = "Wallet"
+
+    def __init__(self, balance):
+        """See help(CompactWallet)"""
+        self.cents = to_cents(balance)
+
+    @property
+    def balance(self):
+        """The amount of money currently in the wallet, in dollars."""
+        return self.cents / 100
+
+    def buy_item(self, cost, number=1):
+        """Spend money and reduce your balance.
+
+        Parameters
+        ----------
+        cost : number
+            cost of the item to buy, in dollars.
+        number : int
+            number of items to buy.
+
+        Raises
+        ------
+        InsufficientCashError
+            If you do not have enough money to spend.
+        """
+        total = to_cents(cost) * number
+        if total <= self.cents:
+            self.cents -= total
+        else:
+            raise InsufficientCashError(
+                f"You can't spend ${format_cents(total)} as you only have "
+                f"${format_cents(self.cents)}."
+            )
+
+    def sell_item(self, cost, number=1):
+        """Sell items and increase your balance.
+
+        Parameters
+        ----------
+        cost : number
+            cost of the item to sell, in dollars.
+        number : int
+            number of items to sell.
+        """
+        self.cents += to_cents(cost) * number
+
+    def __str__(self):
+        return f"A Wallet with balance ${format_cents(self.cents)}"
+
+
+if __name__ == "__main__":
+    import tracemalloc
+
+    from wallet import Wallet
+
+    n_wallets = 1_000_000
+    for cls in (Wallet, CompactWallet):
+        tracemalloc.start()
+        wallets = [cls(i % 10_000 + 0.25) for i in range(n_wallets)]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{n_wallets:,} {cls.__name__}: {size / 2**20:.1f} MiB")
+        del wallets
+
+    drift, exact = Wallet(1), CompactWallet(1)
+    for _ in range(10):
+        drift.buy_item(0.1)
+        exact.buy_item(0.1)
+    print(
+        f"after ten $0.10 buys from $1: Wallet {drift.balance!r}, "
+        f"CompactWallet {exact.balance!r}"
+    )
@@ -0,0 +1,142 @@
+# This module contains a class ConcurrentWalletStore that lets many threads
+# spend and earn cash in a shared set of wallets without overdrawing them.
+
+import threading
+
+from wallet import InsufficientCashError, Wallet
+
+
+class ConcurrentWalletStore:
+    """A thread-safe collection of wallets guarded by striped locks.
+
+    Each wallet id is mapped to one lock from a fixed pool by its hash, so two
+    threads only wait for each other when their wallets share a stripe.
+
+    Parameters
+    ----------
+    balances : dict or iterable of number
+        Amount of starting cash for each wallet. A dict maps wallet ids to
+        balances; any other iterable uses positions as wallet ids.
+    n_stripes : int, optional
+        Number of locks in the pool, by default 64.
+
+    Attributes
+    ----------
+    item : str
+        The type of item, a "ConcurrentWalletStore"
+    """
+
+    item = "ConcurrentWalletStore"
+
+    def __init__(self, balances, n_stripes=64):
+        """See help(ConcurrentWalletStore)"""
+        if n_stripes < 1:
+            raise ValueError("n_stripes must be at least 1.")
+        if not isinstance(balances, dict):
+            balances = dict(enumerate(balances))
+        self._wallets = {key: Wallet(value) for key, value in balances.items()}
+        self._locks = [threading.Lock() for _ in range(n_stripes)]
+
+    def __len__(self):
+        return len(self._wallets)
+
+    def __str__(self):
+        return f"A ConcurrentWalletStore with {len(self)} wallets"
+
+    def _lock(self, wallet_id):
+        """Return the lock guarding `wallet_id`."""
+        return self._locks[hash(wallet_id) % len(self._locks)]
+
+    def balance(self, wallet_id):
+        """Return the current balance of a wallet."""
+        with self._lock(wallet_id):
+            return self._wallets[wallet_id].balance
+
+    def buy_item(self, wallet_id, cost, number=1):
+        """Spend money from a wallet, see `Wallet.buy_item`.
+
+        Raises
+        ------
+        InsufficientCashError
+            If the wallet does not have enough money to spend.
+        """
+        with self._lock(wallet_id):
+            self._wallets[wallet_id].buy_item(cost, number)
+
+    def sell_item(self, wallet_id, cost, number=1):
+        """Sell items and increase a wallet's balance, see `Wallet.sell_item`."""
+        with self._lock(wallet_id):
+            self._wallets[wallet_id].sell_item(cost, number)
+
+    def balances(self):
+        """Return a dict of all balances, read under every lock at once."""
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            return {key: wallet.balance for key, wallet in self._wallets.items()}
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+
+def stress(store, n_threads=16, n_ops=20_000, seed=2021):
+    """Hammer `store` from many threads with random buys and sells.
+
+    Parameters
+    ----------
+    store : ConcurrentWalletStore
+        Store whose wallet ids are 0, 1, ..., len(store) - 1.
+    n_threads : int, optional
+        Number of worker threads, by default 16.
+    n_ops : int, optional
+        Number of transactions per thread, by default 20,000.
+    seed : int, optional
+        Seed for the per-thread random streams, by default 2021.
+
+    Returns
+    -------
+    tuple of (float, int)
+        Elapsed seconds and the number of rejected purchases.
+    """
+    import random
+    import time
+
+    rejected = [0] * n_threads
+    barrier = threading.Barrier(n_threads + 1)
+
+    def work(k):
+        rng = random.Random(seed + k)
+        barrier.wait()
+        for _ in range(n_ops):
+            wallet_id = rng.randrange(len(store))
+            cost = rng.randint(1, 20)
+            if rng.random() < 0.7:
+                try:
+                    store.buy_item(wallet_id, cost)
+                except InsufficientCashError:
+                    rejected[k] += 1
+            else:
+                store.sell_item(wallet_id, cost)
+
+    threads = [threading.Thread(target=work, args=(k,)) for k in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    tic = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - tic, sum(rejected)
+
+
+if __name__ == "__main__":
+    n_wallets, n_ops = 100, 20_000
+    for n_threads in (1, 4, 16, 32):
+        store = ConcurrentWalletStore([50] * n_wallets)
+        elapsed, rejected = stress(store, n_threads, n_ops)
+        lowest = min(store.balances().values())
+        assert lowest >= 0, "a wallet was overdrawn"
+        rate = n_threads * n_ops / elapsed
+        print(
+            f"{n_threads:>2} threads: {rate:,.0f} ops/s, "
+            f"{rejected} rejected, lowest balance {lowest}"
+        )
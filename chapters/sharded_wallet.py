@@ -0,0 +1,159 @@
+# This module contains a class ShardedWalletStore that keeps wallet balances in
+# shared memory and applies transactions in parallel worker processes.
+
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from wallet_book import WalletBook
+
+
+def _serve(shm_name, n_wallets, conn):
+    """Apply the batches received on `conn` to the shared balances."""
+    shm = SharedMemory(name=shm_name)
+    balances = np.ndarray((n_wallets,), dtype=np.float64, buffer=shm.buf)
+    book = WalletBook(balances, copy=False)
+    try:
+        while (request := conn.recv()) is not None:
+            kind, ids, amounts = request
+            if kind == "buy":
+                conn.send(book.buy_items(ids, amounts))
+            else:
+                book.sell_items(ids, amounts)
+                conn.send(None)
+    finally:
+        del book, balances
+        shm.close()
+
+
+class ShardedWalletStore:
+    """Wallets in shared memory, each owned by one of several worker processes.
+
+    Wallet id `i` belongs to worker `i % n_workers`. A batch is split by owner
+    and every worker applies its share directly to the shared balances, so no
+    locks are needed and the per-wallet order of the batch is preserved.
+
+    Parameters
+    ----------
+    balances : array-like
+        Amount of starting cash for each wallet.
+    n_workers : int, optional
+        Number of worker processes, by default the number of CPUs.
+
+    Attributes
+    ----------
+    item : str
+        The type of item, a "ShardedWalletStore"
+    balances : numpy.ndarray
+        The amount of money currently in each wallet, a view of shared memory.
+    """
+
+    item = "ShardedWalletStore"
+
+    def __init__(self, balances, n_workers=None):
+        """See help(ShardedWalletStore)"""
+        balances = np.asarray(balances, dtype=np.float64)
+        self.n_workers = n_workers or mp.cpu_count()
+        self._shm = SharedMemory(create=True, size=max(1, balances.nbytes))
+        self.balances = np.ndarray(balances.shape, np.float64, buffer=self._shm.buf)
+        self.balances[:] = balances
+        self._conns = []
+        self._workers = []
+        for _ in range(self.n_workers):
+            parent, child = mp.Pipe()
+            args = (self._shm.name, len(balances), child)
+            worker = mp.Process(target=_serve, args=args, daemon=True)
+            worker.start()
+            self._conns.append(parent)
+            self._workers.append(worker)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.balances)
+
+    def __str__(self):
+        return f"A ShardedWalletStore with {len(self)} wallets"
+
+    def _scatter(self, kind, ids, costs, numbers):
+        """Send each worker its rows of a batch and return the row positions."""
+        ids = np.asarray(ids, dtype=np.intp)
+        amounts = np.multiply(costs, numbers, dtype=np.float64)
+        amounts = np.broadcast_to(amounts, ids.shape)
+        if ids.size and (ids.min() < 0 or ids.max() >= len(self)):
+            raise IndexError("wallet id out of range.")
+        # group the rows by owner in one pass, keeping batch order within each
+        # owner; a stable argsort of 16-bit keys is a linear-time radix sort
+        owners = ids % self.n_workers
+        keys = owners.astype(np.uint16) if self.n_workers <= 1 << 16 else owners
+        order = np.argsort(keys, kind="stable")
+        edges = np.r_[0, np.cumsum(np.bincount(owners, minlength=self.n_workers))]
+        ids_by_owner, amounts_by_owner = ids[order], amounts[order]
+        shards = []
+        for conn, lo, hi in zip(self._conns, edges[:-1].tolist(), edges[1:].tolist()):
+            conn.send((kind, ids_by_owner[lo:hi], amounts_by_owner[lo:hi]))
+            shards.append(order[lo:hi])
+        return ids, shards
+
+    def buy_items(self, ids, costs, numbers=1):
+        """Spend money from many wallets in parallel, see `WalletBook.buy_items`.
+
+        Returns
+        -------
+        numpy.ndarray of bool
+            True for each purchase that failed for lack of cash.
+        """
+        ids, shards = self._scatter("buy", ids, costs, numbers)
+        failed = np.zeros(len(ids), dtype=bool)
+        for conn, rows in zip(self._conns, shards):
+            failed[rows] = conn.recv()
+        return failed
+
+    def sell_items(self, ids, costs, numbers=1):
+        """Sell items from many wallets in parallel, see `WalletBook.sell_items`."""
+        self._scatter("sell", ids, costs, numbers)
+        for conn in self._conns:
+            conn.recv()
+
+    def close(self):
+        """Stop the workers and release the shared memory."""
+        if not self._workers:
+            return
+        for conn, worker in zip(self._conns, self._workers):
+            conn.send(None)
+            worker.join()
+            conn.close()
+        self._workers = []
+        del self.balances
+        self._shm.close()
+        self._shm.unlink()
+
+
+if __name__ == "__main__":
+    import time
+
+    n_wallets, n_rows, n_batches = 1_000_000, 2_000_000, 5
+    rng = np.random.default_rng(2021)
+    start = rng.uniform(0, 100, n_wallets)
+    batches = [
+        (rng.integers(0, n_wallets, n_rows), rng.uniform(0, 50, n_rows))
+        for _ in range(n_batches)
+    ]
+
+    expected = WalletBook(start)
+    expected_failed = [expected.buy_items(ids, costs) for ids, costs in batches]
+
+    for n_workers in range(1, max(4, mp.cpu_count()) + 1):
+        with ShardedWalletStore(start, n_workers) as store:
+            tic = time.perf_counter()
+            failed = [store.buy_items(ids, costs) for ids, costs in batches]
+            elapsed = time.perf_counter() - tic
+            assert np.array_equal(store.balances, expected.balances)
+            assert all(map(np.array_equal, failed, expected_failed))
+        rate = n_rows * n_batches / elapsed
+        print(f"{n_workers:>2} processes: {rate:,.0f} purchases/s")
@@ -1,5 +1,7 @@
 # This module contains a class Wallet that can be used to store, spend, and earn cash.
 
+from collections import namedtuple
+
 
 class Wallet:
     """A wallet that can store, spend, and earn cash.
@@ -41,9 +43,77 @@ class Wallet:
         if cost * number <= self.balance:
             self.balance -= cost * number
         else:
-            raise InsufficientCashError(
-                f"You can't spend ${cost * number} as you only have ${self.balance}."
-            )
+            raise Rejection(cost, number, self.balance).error()
+
+    def try_buy(self, cost, number=1):
+        """Spend money if you can afford it, without raising an error.
+
+        Parameters
+        ----------
+        cost : number
+            cost of the item to buy.
+        number : int
+            number of items to buy.
+
+        Returns
+        -------
+        Rejection or None
+            None if the purchase went through, otherwise a Rejection that can
+            build the matching InsufficientCashError on request.
+        """
+        if cost * number <= self.balance:
+            self.balance -= cost * number
+            return None
+        return Rejection(cost, number, self.balance)
+
+    def try_buy_many(self, items):
+        """Make many purchases in order, without raising an error.
+
+        Parameters
+        ----------
+        items : iterable of (number, int)
+            (cost, number) pair of each purchase.
+
+        Returns
+        -------
+        list of Rejection or None
+            The result of each purchase, as returned by `try_buy`.
+        """
+        balance = self.balance
+        results = []
+        for cost, number in items:
+            if cost * number <= balance:
+                balance -= cost * number
+                results.append(None)
+            else:
+                results.append(Rejection(cost, number, balance))
+        self.balance = balance
+        return results
+
+    def checkout(self, items):
+        """Buy a whole cart of items at once, or nothing at all.
+
+        Parameters
+        ----------
+        items : iterable of (number, int)
+            (cost, number) pair of each line in the cart.
+
+        Returns
+        -------
+        number
+            The total cost of the cart.
+
+        Raises
+        ------
+        InsufficientCashError
+            If you do not have enough money for the whole cart. The balance
+            is left unchanged.
+        """
+        total = sum(cost * number for cost, number in items)
+        if total <= self.balance:
+            self.balance -= total
+            return total
+        raise Rejection(total, 1, self.balance).error()
 
     def sell_item(self, cost, number=1):
         """Sell items and increase your balance.
@@ -63,3 +133,26 @@ class InsufficientCashError(Exception):
     """Custom error used when there is insufficient cash for a transaction."""
 
     pass
+
+
+class Rejection(namedtuple("Rejection", ["cost", "number", "balance"])):
+    """A purchase that was refused for lack of cash.
+
+    Attributes
+    ----------
+    cost : number
+        cost of the item that could not be bought.
+    number : int
+        number of items that could not be bought.
+    balance : number
+        The balance of the wallet at the time of the purchase.
+    """
+
+    __slots__ = ()
+
+    def error(self):
+        """Build the InsufficientCashError that `Wallet.buy_item` would raise."""
+        return InsufficientCashError(
+            f"You can't spend ${self.cost * self.number} as you only have "
+            f"${self.balance}."
+        )
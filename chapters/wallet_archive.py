@@ -0,0 +1,256 @@
+# This module contains a compressed, columnar archive format for wallet
+# ledgers and functions to write and scan it.
+#
+# An archive holds integer columns, e.g. time, wallet and amount in cents. Rows
+# are split into blocks. In each block every column is delta encoded, zigzag
+# mapped to unsigned integers and written as LEB128 varints, and the block
+# header keeps the min and max of every column. Scans read the headers first
+# and only decode blocks whose ranges can match.
+
+import struct
+
+import numpy as np
+
+MAGIC = b"WLAR\x01"
+COUNT = struct.Struct("<I")
+COLUMN_HEADER = struct.Struct("<qqI")  # min, max, number of encoded bytes
+
+
+def zigzag(values):
+    """Map signed integers to unsigned ones: 0, -1, 1, -2, ... -> 0, 1, 2, 3, ..."""
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).view(np.uint64)
+
+
+def unzigzag(values):
+    """Invert `zigzag`."""
+    half = (values >> np.uint64(1)).view(np.int64)
+    sign = (values & np.uint64(1)).view(np.int64)
+    return half ^ -sign
+
+
+def encode_varints(values):
+    """Encode unsigned 64-bit integers as LEB128 varints, all at once.
+
+    Parameters
+    ----------
+    values : numpy.ndarray of uint64
+        The integers to encode.
+
+    Returns
+    -------
+    bytes
+        7 bits per byte, least significant group first, with the high bit
+        set on every byte except the last of each integer.
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(len(values), dtype=np.intp)
+    for k in range(1, 10):
+        lengths += values >= np.uint64(1) << np.uint64(7 * k)
+    starts = np.cumsum(lengths) - lengths
+    out = np.empty(lengths.sum(), dtype=np.uint8)
+    for k in range(lengths.max(initial=0)):
+        rows = np.flatnonzero(lengths > k)
+        group = (values[rows] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (lengths[rows] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[rows] + k] = group | more
+    return out.tobytes()
+
+
+def decode_varints(data, count):
+    """Decode `count` LEB128 varints from `data` into a uint64 array."""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(raw < 0x80)[:count]
+    if len(ends) != count:
+        raise ValueError("Truncated varint data.")
+    starts = np.r_[0, ends[:-1] + 1] if count else ends
+    lengths = ends - starts + 1
+    values = np.zeros(count, dtype=np.uint64)
+    for k in range(lengths.max(initial=0)):
+        rows = np.flatnonzero(lengths > k)
+        group = (raw[starts[rows] + k] & 0x7F).astype(np.uint64)
+        values[rows] |= group << np.uint64(7 * k)
+    return values
+
+
+def write_archive(path, columns, block_size=65_536):
+    """Write integer columns to an archive file.
+
+    Parameters
+    ----------
+    path : str or path-like
+        Location of the archive.
+    columns : dict of str to array-like of int
+        Columns of equal length, e.g. {"wallet": ids, "amount": cents}.
+    block_size : int, optional
+        Number of rows per block, by default 65,536.
+
+    Raises
+    ------
+    TypeError
+        If a column does not hold integers that fit in int64, e.g. floats or
+        uint64. Values are never rounded or wrapped silently.
+    """
+    names = list(columns)
+    arrays = [np.asarray(columns[name]) for name in names]
+    for name, array in zip(names, arrays):
+        if not np.can_cast(array.dtype, np.int64):
+            raise TypeError(
+                f"Column {name!r} has dtype {array.dtype}, not integers that fit "
+                "in int64; convert amounts to whole cents first, see "
+                "compact_wallet.to_cents."
+            )
+    arrays = [array.astype(np.int64) for array in arrays]
+    n_rows = len(arrays[0]) if arrays else 0
+    if any(len(array) != n_rows for array in arrays):
+        raise ValueError("All columns must have the same length.")
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(COUNT.pack(len(names)))
+        for name in names:
+            encoded = name.encode()
+            f.write(COUNT.pack(len(encoded)) + encoded)
+        for lo in range(0, n_rows, block_size):
+            f.write(COUNT.pack(min(block_size, n_rows - lo)))
+            for array in arrays:
+                block = array[lo : lo + block_size]
+                payload = encode_varints(zigzag(np.diff(block, prepend=0)))
+                f.write(COLUMN_HEADER.pack(block.min(), block.max(), len(payload)))
+                f.write(payload)
+
+
+class ArchiveReader:
+    """Scan an archive written by `write_archive`.
+
+    Opening an archive reads only the block headers. Payloads are decoded
+    block by block, and blocks whose min/max summary rules them out are
+    skipped without being read.
+
+    Parameters
+    ----------
+    path : str or path-like
+        Location of the archive.
+
+    Attributes
+    ----------
+    names : list of str
+        Column names.
+    blocks : list of dict
+        For each block, its number of rows and, per column, its (min, max)
+        summary and the file offset and size of its payload.
+    """
+
+    def __init__(self, path):
+        """See help(ArchiveReader)"""
+        self.path = path
+        self.blocks = []
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a wallet archive.")
+            (n_columns,) = COUNT.unpack(f.read(COUNT.size))
+            self.names = []
+            for _ in range(n_columns):
+                (length,) = COUNT.unpack(f.read(COUNT.size))
+                self.names.append(f.read(length).decode())
+            while header := f.read(COUNT.size):
+                block = {"n_rows": COUNT.unpack(header)[0], "columns": {}}
+                for name in self.names:
+                    low, high, size = COLUMN_HEADER.unpack(f.read(COLUMN_HEADER.size))
+                    block["columns"][name] = (low, high, f.tell(), size)
+                    f.seek(size, 1)
+                self.blocks.append(block)
+
+    def __len__(self):
+        return sum(block["n_rows"] for block in self.blocks)
+
+    def scan(self, columns=None, **ranges):
+        """Read columns, keeping only rows whose values fall in `ranges`.
+
+        Parameters
+        ----------
+        columns : list of str, optional
+            Columns to return, by default all of them.
+        **ranges : (int, int)
+            Inclusive (low, high) bounds on columns, e.g. wallet=(10, 10).
+
+        Returns
+        -------
+        dict of str to numpy.ndarray
+            The matching rows of each requested column.
+        """
+        columns = self.names if columns is None else list(columns)
+        needed = list(dict.fromkeys([*columns, *ranges]))
+        parts = {name: [] for name in columns}
+        with open(self.path, "rb") as f:
+            for block in self.blocks:
+                summary = block["columns"]
+                if any(
+                    summary[name][1] < low or summary[name][0] > high
+                    for name, (low, high) in ranges.items()
+                ):
+                    continue
+                decoded = {}
+                for name in needed:
+                    _, _, offset, size = summary[name]
+                    f.seek(offset)
+                    deltas = decode_varints(f.read(size), block["n_rows"])
+                    decoded[name] = np.cumsum(unzigzag(deltas))
+                keep = np.ones(block["n_rows"], dtype=bool)
+                for name, (low, high) in ranges.items():
+                    keep &= (decoded[name] >= low) & (decoded[name] <= high)
+                for name in columns:
+                    parts[name].append(decoded[name][keep])
+        return {
+            name: np.concatenate(arrays) if arrays else np.empty(0, np.int64)
+            for name, arrays in parts.items()
+        }
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    import time
+
+    n_rows = 5_000_000
+    rng = np.random.default_rng(2021)
+    ledger = {
+        "time": np.cumsum(rng.integers(0, 1_000, n_rows)),
+        "wallet": rng.integers(0, 100_000, n_rows),
+        "amount": np.where(rng.random(n_rows) < 0.5, -1, 1)
+        * rng.integers(1, 10_000, n_rows),
+    }
+    raw_size = sum(array.nbytes for array in ledger.values())
+    for bad in ([12.34, -5.99, 0.5], np.array([2**63], dtype=np.uint64)):
+        try:
+            write_archive(os.devnull, {"amount": bad})
+        except TypeError:
+            continue
+        raise AssertionError(f"{bad} would have been truncated or wrapped")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ledger.wlar")
+        tic = time.perf_counter()
+        write_archive(path, ledger)
+        encode_time = time.perf_counter() - tic
+        size = os.path.getsize(path)
+
+        tic = time.perf_counter()
+        reader = ArchiveReader(path)
+        decoded = reader.scan()
+        decode_time = time.perf_counter() - tic
+        assert all(np.array_equal(decoded[k], v) for k, v in ledger.items())
+
+        t_low = ledger["time"][n_rows // 2]
+        t_high = ledger["time"][n_rows // 2 + 10_000]
+        tic = time.perf_counter()
+        window = reader.scan(["wallet", "amount"], time=(t_low, t_high))
+        scan_time = time.perf_counter() - tic
+
+    mb = raw_size / 2**20
+    print(
+        f"raw {mb:.0f} MiB -> archive {size / 2**20:.0f} MiB "
+        f"(ratio {raw_size / size:.2f}x)"
+    )
+    print(f"encode {mb / encode_time:,.0f} MiB/s, decode {mb / decode_time:,.0f} MiB/s")
+    rows = len(window["wallet"])
+    print(f"time-range scan of {rows:,} rows: {scan_time * 1000:.1f} ms")
@@ -0,0 +1,143 @@
+# This module contains a benchmark suite for Wallet. It times buy_item,
+# sell_item, the InsufficientCashError path and the non-raising try_buy API,
+# and saves the results as JSON.
+#
+# Usage: python wallet_bench.py [--n-ops N] [--output results.json]
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from wallet import InsufficientCashError, Wallet
+
+PERCENTILES = (50, 90, 99, 99.9)
+FAILURE_RATIOS = (0.0, 0.01, 0.1, 0.5, 0.9, 1.0)
+
+
+def percentile(sorted_values, q):
+    """Return the q-th percentile of an already sorted list (nearest rank)."""
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(name, latencies_ns, elapsed, **params):
+    """Summarize one benchmark run as a dict of throughput and percentiles."""
+    latencies_ns = sorted(latencies_ns)
+    result = {"name": name, **params, "n_ops": len(latencies_ns)}
+    result["ops_per_s"] = len(latencies_ns) / elapsed
+    for q in PERCENTILES:
+        result[f"p{q}_ns"] = percentile(latencies_ns, q)
+    return result
+
+
+def time_calls(func, calls):
+    """Call `func(*args)` for each args in `calls`, timing every call.
+
+    Calls that raise InsufficientCashError are counted as rejections.
+
+    Returns
+    -------
+    tuple of (list of int, float, int)
+        Per-call latencies in nanoseconds, total elapsed seconds and the
+        number of rejections.
+    """
+    clock = time.perf_counter_ns
+    latencies = []
+    rejected = 0
+    start = clock()
+    for args in calls:
+        tic = clock()
+        try:
+            func(*args)
+        except InsufficientCashError:
+            rejected += 1
+        latencies.append(clock() - tic)
+    return latencies, (clock() - start) / 1e9, rejected
+
+
+def buy_calls(n_ops, failure_ratio, balance, seed=2021):
+    """Make `buy_item` arguments of which `failure_ratio` cannot be afforded."""
+    rng = random.Random(seed)
+    return [
+        (balance * 10, 1) if rng.random() < failure_ratio else (1.0, 1)
+        for _ in range(n_ops)
+    ]
+
+
+def run_suite(n_ops=100_000, failure_ratios=FAILURE_RATIOS):
+    """Run every benchmark and return the results as a list of dicts."""
+    balance = 1e12
+    results = []
+
+    wallet = Wallet(balance)
+    latencies, elapsed, _ = time_calls(wallet.sell_item, [(1.0, 1)] * n_ops)
+    results.append(summarize("sell_item", latencies, elapsed))
+
+    for ratio in failure_ratios:
+        wallet = Wallet(balance)
+        calls = buy_calls(n_ops, ratio, balance)
+        latencies, elapsed, rejected = time_calls(wallet.buy_item, calls)
+        results.append(
+            summarize(
+                "buy_item",
+                latencies,
+                elapsed,
+                failure_ratio=ratio,
+                rejected=rejected,
+            )
+        )
+
+    for ratio in failure_ratios:
+        wallet = Wallet(balance)
+        calls = buy_calls(n_ops, ratio, balance)
+        latencies, elapsed, _ = time_calls(wallet.try_buy, calls)
+        results.append(summarize("try_buy", latencies, elapsed, failure_ratio=ratio))
+
+        wallet = Wallet(balance)
+        tic = time.perf_counter()
+        rejected = sum(map(bool, wallet.try_buy_many(calls)))
+        elapsed = time.perf_counter() - tic
+        results.append(
+            {
+                "name": "try_buy_many",
+                "failure_ratio": ratio,
+                "n_ops": n_ops,
+                "ops_per_s": n_ops / elapsed,
+                "rejected": rejected,
+            }
+        )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Wallet transactions.")
+    parser.add_argument("--n-ops", type=int, default=100_000)
+    parser.add_argument("--output", help="file to write the JSON results to")
+    args = parser.parse_args(argv)
+
+    report = {
+        "python": sys.version,
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "results": run_suite(args.n_ops),
+    }
+    for result in report["results"]:
+        ratio = result.get("failure_ratio", "")
+        print(
+            f"{result['name']:<12} {ratio!s:>5} {result['ops_per_s']:>12,.0f} ops/s"
+            + (
+                f"  p50 {result['p50_ns']:>6} ns  p99 {result['p99_ns']:>6} ns"
+                if "p50_ns" in result
+                else ""
+            )
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+# This module contains a class WalletBook that stores the balances of many
+# wallets in a single NumPy array and applies transactions in vectorized batches.
+
+import numpy as np
+
+from wallet import InsufficientCashError, Wallet
+
+# rounds smaller than this are applied one row at a time, see WalletBook.apply
+SCALAR_ROUND = 64
+
+
+class WalletBook:
+    """Many wallets whose balances live in one NumPy array.
+
+    Parameters
+    ----------
+    balances : array-like
+        Amount of starting cash for each wallet. Wallet ids are the positions
+        in this array.
+    dtype : data-type, optional
+        Data type of the balance array, by default float64.
+    copy : bool, optional
+        If False and `balances` is already an array of the right dtype, use it
+        directly as storage instead of copying it, by default True.
+
+    Attributes
+    ----------
+    item : str
+        The type of item, a "WalletBook"
+    balances : numpy.ndarray
+        The amount of money currently in each wallet.
+    """
+
+    item = "WalletBook"
+
+    def __init__(self, balances, dtype=np.float64, copy=True):
+        """See help(WalletBook)"""
+        if copy:
+            self.balances = np.array(balances, dtype=dtype)
+        else:
+            self.balances = np.asarray(balances, dtype=dtype)
+        if self.balances.ndim != 1:
+            raise ValueError("balances must be one-dimensional.")
+
+    @classmethod
+    def from_wallets(cls, wallets, dtype=np.float64):
+        """Build a WalletBook from an iterable of Wallet objects."""
+        return cls([wallet.balance for wallet in wallets], dtype=dtype)
+
+    def to_wallets(self):
+        """Return a list of Wallet objects holding the current balances."""
+        return [Wallet(balance) for balance in self.balances.tolist()]
+
+    def __len__(self):
+        return len(self.balances)
+
+    def __str__(self):
+        return f"A WalletBook with {len(self)} wallets"
+
+    def buy_items(self, ids, costs, numbers=1):
+        """Spend money from many wallets at once.
+
+        Rows are applied in order, so the outcome is the same as calling
+        `Wallet.buy_item` once per row. A row that would overdraw its wallet
+        is skipped rather than raising `InsufficientCashError`.
+
+        Parameters
+        ----------
+        ids : array-like of int
+            Wallet id of each purchase.
+        costs : array-like of number
+            cost of the item to buy in each purchase.
+        numbers : array-like of int or int, optional
+            number of items to buy in each purchase, by default 1.
+
+        Returns
+        -------
+        numpy.ndarray of bool
+            True for each purchase that failed for lack of cash.
+        """
+        return self._apply(ids, costs, numbers, True, None)
+
+    def sell_items(self, ids, costs, numbers=1):
+        """Sell items from many wallets at once and increase their balances.
+
+        Parameters
+        ----------
+        ids : array-like of int
+            Wallet id of each sale.
+        costs : array-like of number
+            cost of the item to sell in each sale.
+        numbers : array-like of int or int, optional
+            number of items to sell in each sale, by default 1.
+        """
+        ids, amounts = self._amounts(ids, costs, numbers)
+        np.add.at(self.balances, ids, amounts)
+
+    def checkout(self, ids, carts, costs, numbers=1):
+        """Check out many carts against many wallets at once.
+
+        Each cart is all or nothing, see `Wallet.checkout`. Carts are applied
+        in order, like `buy_items`.
+
+        Parameters
+        ----------
+        ids : array-like of int
+            Wallet id of each cart.
+        carts : array-like of int
+            Cart index (a position in `ids`) of each line.
+        costs : array-like of number
+            cost of the item on each line.
+        numbers : array-like of int or int, optional
+            number of items on each line, by default 1.
+
+        Returns
+        -------
+        numpy.ndarray of bool
+            True for each cart that failed for lack of cash.
+        """
+        ids = np.asarray(ids, dtype=np.intp)
+        carts = np.asarray(carts, dtype=np.intp)
+        if carts.size and (carts.min() < 0 or carts.max() >= len(ids)):
+            raise IndexError("cart index out of range.")
+        amounts = np.multiply(costs, numbers, dtype=self.balances.dtype)
+        # sum in the balance dtype, so integer cents never pass through floats
+        totals = np.zeros(len(ids), dtype=self.balances.dtype)
+        np.add.at(totals, carts, np.broadcast_to(amounts, carts.shape))
+        return self.buy_items(ids, totals)
+
+    def apply(self, ids, costs, numbers=1, is_buy=True, out_balances=None):
+        """Apply a mixed batch of purchases and sales in order.
+
+        Parameters
+        ----------
+        ids : array-like of int
+            Wallet id of each transaction.
+        costs : array-like of number
+            cost of the item in each transaction.
+        numbers : array-like of int or int, optional
+            number of items in each transaction, by default 1.
+        is_buy : array-like of bool or bool, optional
+            True for purchases and False for sales, by default True.
+        out_balances : numpy.ndarray, optional
+            If given, receives the balance of each row's wallet just before
+            the row was applied.
+
+        Returns
+        -------
+        numpy.ndarray of bool
+            True for each purchase that failed for lack of cash.
+        """
+        return self._apply(ids, costs, numbers, is_buy, out_balances)
+
+    def _apply(self, ids, costs, numbers, is_buy, out_balances):
+        """Apply a mixed batch in order, see `apply`.
+
+        buy_items calls this rather than `apply`, so subclasses that wrap the
+        public methods (e.g. with a lock) are not entered twice.
+        """
+        ids, amounts = self._amounts(ids, costs, numbers)
+        is_buy = np.broadcast_to(np.asarray(is_buy, dtype=bool), ids.shape)
+        failed = np.zeros(len(ids), dtype=bool)
+        rounds = _rounds(ids)
+        for rows in rounds:
+            if len(rows) < SCALAR_ROUND and self._exact_scalars():
+                # the remaining rounds only touch a few busy wallets, and
+                # looping over them is cheaper than one NumPy call per round
+                rest = np.sort(np.concatenate([rows, *rounds]))
+                self._apply_sequential(rest, ids, amounts, is_buy, failed, out_balances)
+                break
+            wallet_ids = ids[rows]
+            buys = is_buy[rows]
+            before = self.balances[wallet_ids]
+            ok = ~buys | (amounts[rows] <= before)
+            signed = np.where(buys, -amounts[rows], amounts[rows])
+            self.balances[wallet_ids[ok]] += signed[ok]
+            failed[rows[~ok]] = True
+            if out_balances is not None:
+                out_balances[rows] = before
+        return failed
+
+    def _exact_scalars(self):
+        """Whether Python scalars give the same results as the balance dtype."""
+        return self.balances.dtype == np.float64 or self.balances.dtype.kind in "iu"
+
+    def _apply_sequential(self, rows, ids, amounts, is_buy, failed, out_balances):
+        """Apply the given rows one at a time, in order, with Python scalars."""
+        wallet_ids = ids[rows]
+        busy = np.unique(wallet_ids)
+        balances = dict(zip(busy.tolist(), self.balances[busy].tolist()))
+        before = []
+        for row, wallet_id, amount, buy in zip(
+            rows.tolist(),
+            wallet_ids.tolist(),
+            amounts[rows].tolist(),
+            is_buy[rows].tolist(),
+        ):
+            balance = balances[wallet_id]
+            before.append(balance)
+            if not buy:
+                balances[wallet_id] = balance + amount
+            elif amount <= balance:
+                balances[wallet_id] = balance - amount
+            else:
+                failed[row] = True
+        self.balances[busy] = [balances[wallet_id] for wallet_id in busy.tolist()]
+        if out_balances is not None:
+            out_balances[rows] = before
+
+    def _amounts(self, ids, costs, numbers):
+        """Validate a batch and return its wallet ids and total amounts."""
+        ids = np.asarray(ids, dtype=np.intp)
+        amounts = np.multiply(costs, numbers, dtype=self.balances.dtype)
+        amounts = np.broadcast_to(amounts, ids.shape)
+        if ids.size and (ids.min() < 0 or ids.max() >= len(self)):
+            raise IndexError("wallet id out of range.")
+        return ids, amounts
+
+
+def _rounds(ids):
+    """Split row positions into rounds in which every wallet id is unique.
+
+    Round k holds the k-th transaction of every wallet, so applying the rounds
+    one after another preserves the per-wallet order of the batch.
+    """
+    if len(ids) == 0:
+        return
+    order = np.argsort(ids, kind="stable")
+    sorted_ids = ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    group_start = np.repeat(starts, np.diff(np.r_[starts, len(ids)]))
+    rank = np.arange(len(ids)) - group_start
+    if rank.max() == 0:
+        yield np.arange(len(ids))
+        return
+    rank_order = np.argsort(rank, kind="stable")
+    bounds = np.searchsorted(rank[rank_order], np.arange(rank.max() + 2))
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        yield np.sort(order[rank_order[lo:hi]])
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(2021)
+
+    # the scalar tail must give exactly the results of the vectorized rounds;
+    # SCALAR_ROUND = 0 never uses it and a huge SCALAR_ROUND always does
+    skewed = np.minimum(rng.zipf(1.3, 20_000), 50) - 1
+    is_buy = rng.random(len(skewed)) < 0.6
+    for dtype in (np.float64, np.int64):
+        opening = rng.uniform(0, 100, 50).astype(dtype)
+        costs = rng.uniform(0, 30, len(skewed)).astype(dtype)
+        results = []
+        for SCALAR_ROUND in (0, len(skewed) + 1):
+            book = WalletBook(opening, dtype=dtype)
+            before = np.empty(len(skewed), dtype=dtype)
+            failed = book.apply(skewed, costs, 1, is_buy, out_balances=before)
+            results.append((failed, before, book.balances))
+        assert all(np.array_equal(a, b) for a, b in zip(*results)), dtype
+    SCALAR_ROUND = 64
+
+    n_wallets, n_rows = 1_000_000, 1_000_000
+    start = rng.uniform(0, 100, n_wallets)
+    ids = rng.integers(0, n_wallets, n_rows)
+    costs = rng.uniform(0, 50, n_rows)
+    numbers = rng.integers(1, 4, n_rows)
+
+    wallets = [Wallet(balance) for balance in start.tolist()]
+    tic = time.perf_counter()
+    loop_failed = []
+    for i, cost, number in zip(ids.tolist(), costs.tolist(), numbers.tolist()):
+        try:
+            wallets[i].buy_item(cost, number)
+            loop_failed.append(False)
+        except InsufficientCashError:
+            loop_failed.append(True)
+    loop_time = time.perf_counter() - tic
+
+    book = WalletBook(start)
+    tic = time.perf_counter()
+    failed = book.buy_items(ids, costs, numbers)
+    book_time = time.perf_counter() - tic
+
+    assert failed.tolist() == loop_failed
+    assert np.array_equal(book.balances, [w.balance for w in wallets])
+    print(f"buy_item loop: {loop_time:.3f}s, buy_items: {book_time:.3f}s")
+
+    n_carts = n_rows // 4
+    cart_ids = rng.integers(0, n_wallets, n_carts)
+    carts = np.sort(rng.integers(0, n_carts, n_rows))
+    bounds = np.searchsorted(carts, np.arange(n_carts + 1))
+    cart_items = [
+        list(zip(costs[lo:hi].tolist(), numbers[lo:hi].tolist()))
+        for lo, hi in zip(bounds[:-1], bounds[1:])
+    ]
+    tic = time.perf_counter()
+    loop_failed = []
+    for i, items in zip(cart_ids.tolist(), cart_items):
+        try:
+            wallets[i].checkout(items)
+            loop_failed.append(False)
+        except InsufficientCashError:
+            loop_failed.append(True)
+    loop_time = time.perf_counter() - tic
+
+    tic = time.perf_counter()
+    failed = book.checkout(cart_ids, carts, costs, numbers)
+    book_time = time.perf_counter() - tic
+
+    assert failed.tolist() == loop_failed
+    assert np.array_equal(book.balances, [w.balance for w in wallets])
+    print(f"checkout loop: {loop_time:.3f}s, checkout: {book_time:.3f}s")
+
+    cents = WalletBook([10_000, 5_000], dtype=np.int64)
+    failed = cents.checkout([0, 1], [0, 0, 1], [2_500, 1_000, 6_000], [2, 1, 1])
+    assert failed.tolist() == [False, True]
+    assert cents.balances.tolist() == [4_000, 5_000]
+    try:
+        cents.checkout([0], [-1], [100])
+    except IndexError:
+        pass
+    else:
+        raise AssertionError("accepted a negative cart index")
@@ -0,0 +1,197 @@
+# This module contains a class FxRates, a table of exchange rates, and a class
+# FxWalletBook, a WalletBook whose wallets and prices can be in different
+# currencies.
+
+import numpy as np
+
+from wallet_book import WalletBook
+
+
+class FxRates:
+    """A table of exchange rates held in one NumPy array.
+
+    Every currency gets an integer code, its position in the table. Converting
+    a batch looks up the rates of all rows with a single fancy-index.
+
+    Parameters
+    ----------
+    rates : dict of str to number
+        Value of one unit of each currency in the base currency, e.g.
+        {"USD": 1.0, "EUR": 1.08}.
+
+    Attributes
+    ----------
+    item : str
+        The type of item, "FxRates"
+    codes : list of str
+        Currency names, in the order of their integer codes.
+    """
+
+    item = "FxRates"
+
+    def __init__(self, rates):
+        """See help(FxRates)"""
+        self.codes = list(rates)
+        self._index = {currency: code for code, currency in enumerate(self.codes)}
+        self._rates = np.array([rates[c] for c in self.codes], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __str__(self):
+        return f"FxRates for {', '.join(self.codes)}"
+
+    def __getitem__(self, currency):
+        return self._rates[self._index[currency]]
+
+    def set_rate(self, currency, rate):
+        """Set the value of one unit of `currency` in the base currency."""
+        if currency not in self._index:
+            self._index[currency] = len(self.codes)
+            self.codes.append(currency)
+            self._rates = np.append(self._rates, rate)
+        else:
+            self._rates[self._index[currency]] = rate
+
+    def encode(self, currencies):
+        """Return the integer codes of currency names.
+
+        Parameters
+        ----------
+        currencies : str, array-like of str or array-like of int
+            Currency names. Integer arrays are taken to be codes already and
+            returned unchanged.
+
+        Returns
+        -------
+        numpy.ndarray of int
+            The code of each currency.
+        """
+        currencies = np.asarray(currencies)
+        if currencies.dtype.kind in "iu":
+            return currencies.astype(np.intp, copy=False)
+        # look up each distinct name once, then spread the codes back out
+        names, inverse = np.unique(currencies, return_inverse=True)
+        try:
+            codes = np.array([self._index[name] for name in names.tolist()], np.intp)
+        except KeyError as error:
+            raise KeyError(f"No exchange rate for {error.args[0]!r}.") from None
+        return codes[inverse].reshape(currencies.shape)
+
+    def convert(self, amounts, source, target):
+        """Convert amounts of money between currencies in one pass.
+
+        Parameters
+        ----------
+        amounts : array-like of number
+            Amounts of money in their `source` currency.
+        source, target : str, array-like of str or array-like of int
+            Currency of each amount and currency to convert it to, as names
+            or codes.
+
+        Returns
+        -------
+        numpy.ndarray
+            The amounts in their `target` currency.
+        """
+        factor = self._rates[self.encode(source)] / self._rates[self.encode(target)]
+        return np.multiply(amounts, factor)
+
+
+class FxWalletBook(WalletBook):
+    """A WalletBook whose wallets each hold one currency.
+
+    Batches can be priced in any currency in the rate table. Prices are
+    converted into the currency of each wallet in a single vectorized pass
+    before the batch is applied.
+
+    Parameters
+    ----------
+    balances : array-like
+        Amount of starting cash for each wallet, in its own currency.
+    currencies : str, array-like of str or array-like of int
+        Currency of each wallet, or one currency for all of them.
+    rates : FxRates
+        Exchange rates used to convert prices.
+
+    Attributes
+    ----------
+    item : str
+        The type of item, an "FxWalletBook"
+    balances : numpy.ndarray
+        The amount of money currently in each wallet.
+    currencies : numpy.ndarray of int
+        The currency code of each wallet.
+    rates : FxRates
+        Exchange rates used to convert prices.
+    """
+
+    item = "FxWalletBook"
+
+    def __init__(self, balances, currencies, rates, dtype=np.float64, copy=True):
+        """See help(FxWalletBook)"""
+        super().__init__(balances, dtype=dtype, copy=copy)
+        self.rates = rates
+        codes = rates.encode(currencies)
+        self.currencies = np.broadcast_to(codes, self.balances.shape).copy()
+
+    def _prices(self, ids, costs, price_currencies):
+        """Convert `costs` into the currency of each wallet in `ids`."""
+        if price_currencies is None:
+            return costs
+        ids = np.asarray(ids, dtype=np.intp)
+        return self.rates.convert(costs, price_currencies, self.currencies[ids])
+
+    def buy_items(self, ids, costs, numbers=1, currencies=None):
+        """Spend money from many wallets at once, see `WalletBook.buy_items`.
+
+        Parameters
+        ----------
+        currencies : str, array-like of str or array-like of int, optional
+            Currency each cost is priced in, by default the currency of the
+            wallet.
+        """
+        costs = self._prices(ids, costs, currencies)
+        return super().buy_items(ids, costs, numbers)
+
+    def sell_items(self, ids, costs, numbers=1, currencies=None):
+        """Sell items from many wallets at once, see `WalletBook.sell_items`.
+
+        Parameters
+        ----------
+        currencies : str, array-like of str or array-like of int, optional
+            Currency each cost is priced in, by default the currency of the
+            wallet.
+        """
+        costs = self._prices(ids, costs, currencies)
+        super().sell_items(ids, costs, numbers)
+
+    def total(self, currency):
+        """Return the value of all wallets together in `currency`."""
+        return self.rates.convert(self.balances, self.currencies, currency).sum()
+
+
+if __name__ == "__main__":
+    import time
+
+    rates = FxRates({"USD": 1.0, "EUR": 1.08, "GBP": 1.27, "JPY": 0.0067})
+    n_wallets, n_rows = 1_000_000, 10_000_000
+    rng = np.random.default_rng(2021)
+    book = FxWalletBook(
+        rng.uniform(0, 1000, n_wallets),
+        rng.integers(0, len(rates), n_wallets),
+        rates,
+    )
+    ids = rng.integers(0, n_wallets, n_rows)
+    costs = rng.uniform(0, 50, n_rows)
+    price_currencies = rng.integers(0, len(rates), n_rows)
+
+    tic = time.perf_counter()
+    converted = book._prices(ids, costs, price_currencies)
+    elapsed = time.perf_counter() - tic
+    print(f"converted {n_rows:,} prices in {elapsed * 1000:.0f} ms")
+
+    row = 123
+    expected = costs[row] * rates[rates.codes[price_currencies[row]]]
+    expected /= rates[rates.codes[book.currencies[ids[row]]]]
+    assert np.isclose(converted[row], expected)
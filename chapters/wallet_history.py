@@ -0,0 +1,166 @@
+# This module contains a class HistoryWallet, a Wallet that records when each
+# transaction happened so past balances can be looked up quickly.
+
+import time
+from bisect import bisect_right
+
+from wallet import Wallet
+
+
+class HistoryWallet(Wallet):
+    """A wallet that remembers its balance after every transaction.
+
+    Transactions are stored as two parallel lists: their timestamps and the
+    running balance after each one (a prefix sum of all cash moved). Recording
+    a transaction is O(1) and any past balance is found by binary search in
+    O(log n).
+
+    Parameters
+    ----------
+    balance : number
+        Amount of starting cash.
+    start : float, optional
+        Time at which the wallet was opened, by default now.
+
+    Attributes
+    ----------
+    item : str
+        The type of item, a "Wallet"
+    balance : float
+        The amount of money currently in the wallet.
+    opening_balance : number
+        The amount of cash the wallet was opened with.
+    start : float
+        Time at which the wallet was opened.
+    """
+
+    def __init__(self, balance, start=None):
+        """See help(HistoryWallet)"""
+        super().__init__(balance)
+        self.opening_balance = balance
+        self.start = time.time() if start is None else start
+        self._times = []
+        self._balances = []
+
+    def _check_time(self, when):
+        """Return the time of a new transaction, now if `when` is None."""
+        when = time.time() if when is None else when
+        last = self._times[-1] if self._times else self.start
+        if when < last:
+            raise ValueError(f"Transaction at {when} is earlier than {last}.")
+        return when
+
+    def _record(self, when):
+        """Append the current balance to the history at time `when`."""
+        self._times.append(when)
+        self._balances.append(self.balance)
+
+    def buy_item(self, cost, number=1, when=None):
+        """Spend money and reduce your balance, see `Wallet.buy_item`.
+
+        Parameters
+        ----------
+        when : float, optional
+            Time of the purchase, by default now. Must not be earlier than the
+            previous transaction.
+
+        Raises
+        ------
+        InsufficientCashError
+            If you do not have enough money to spend. Nothing is recorded.
+        """
+        when = self._check_time(when)
+        super().buy_item(cost, number)
+        self._record(when)
+
+    def try_buy(self, cost, number=1, when=None):
+        """Spend money if you can afford it, see `Wallet.try_buy`.
+
+        Only purchases that go through are recorded.
+        """
+        when = self._check_time(when)
+        rejection = super().try_buy(cost, number)
+        if rejection is None:
+            self._record(when)
+        return rejection
+
+    def try_buy_many(self, items, when=None):
+        """Make many purchases in order, see `Wallet.try_buy_many`.
+
+        All purchases that go through are recorded at time `when`.
+        """
+        when = self._check_time(when)
+        return [self.try_buy(cost, number, when) for cost, number in items]
+
+    def checkout(self, items, when=None):
+        """Buy a whole cart of items at once, see `Wallet.checkout`.
+
+        The cart is recorded as one transaction at time `when`, by default
+        now. A cart that can't be afforded is not recorded.
+        """
+        when = self._check_time(when)
+        total = super().checkout(items)
+        self._record(when)
+        return total
+
+    def sell_item(self, cost, number=1, when=None):
+        """Sell items and increase your balance, see `Wallet.sell_item`.
+
+        Parameters
+        ----------
+        when : float, optional
+            Time of the sale, by default now. Must not be earlier than the
+            previous transaction.
+        """
+        when = self._check_time(when)
+        super().sell_item(cost, number)
+        self._record(when)
+
+    def __len__(self):
+        return len(self._times)
+
+    def balance_at(self, when):
+        """Return the balance just after all transactions up to time `when`.
+
+        Raises
+        ------
+        ValueError
+            If `when` is before the wallet was opened.
+        """
+        if when < self.start:
+            raise ValueError(f"The wallet did not exist at time {when}.")
+        i = bisect_right(self._times, when)
+        return self._balances[i - 1] if i else self.opening_balance
+
+    def net_flow(self, start, stop):
+        """Return the net cash moved by transactions after `start` up to `stop`."""
+        return self.balance_at(stop) - self.balance_at(start)
+
+
+if __name__ == "__main__":
+    import random
+
+    n_ops = 1_000_000
+    rng = random.Random(2021)
+    wallet = HistoryWallet(100, start=0)
+    for t in range(1, n_ops + 1):
+        if rng.random() < 0.5:
+            wallet.sell_item(rng.randint(1, 10), when=t)
+        else:
+            wallet.try_buy(rng.randint(1, 10), when=t)
+
+    history = HistoryWallet(100, start=0)
+    history.sell_item(10, when=1)
+    history.checkout([(30, 1), (20, 1)], when=2)
+    assert history.balance == history.balance_at(1e12) == 60
+    assert history.balance_at(1) == 110
+
+    queries = [rng.uniform(0, n_ops) for _ in range(100_000)]
+    tic = time.perf_counter()
+    for t in queries:
+        wallet.balance_at(t)
+    elapsed = time.perf_counter() - tic
+    print(
+        f"{len(queries):,} balance_at queries over {len(wallet):,} transactions: "
+        f"{elapsed / len(queries) * 1e6:.2f} us each"
+    )
@@ -0,0 +1,160 @@
+# This module contains a function from_ledger that builds wallets from a large
+# CSV ledger of purchases and sales, reading it in chunks.
+#
+# A ledger has one transaction per row and the columns
+#     wallet,action,cost,number
+# where action is "buy" or "sell".
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from wallet import Rejection
+from wallet_book import WalletBook
+
+Ledger = namedtuple("Ledger", ["book", "wallet_ids", "rejections"])
+
+
+def from_ledger(path, opening=None, chunksize=1_000_000):
+    """Build wallets by replaying a CSV ledger.
+
+    The file is read `chunksize` rows at a time with numeric columns parsed in
+    bulk, and each chunk is applied to a WalletBook in order. Memory use grows
+    with the number of wallets and rejected rows, not with the ledger length.
+
+    Parameters
+    ----------
+    path : str, path-like or file-like
+        The CSV ledger to read.
+    opening : dict, optional
+        Starting balance of wallets, keyed by ledger wallet id. Other wallets
+        start with 0.
+    chunksize : int, optional
+        Number of rows to read at a time, by default 1,000,000.
+
+    Returns
+    -------
+    Ledger
+        A namedtuple of
+        book : WalletBook
+            The final balances.
+        wallet_ids : list
+            The ledger wallet id of each wallet in `book`.
+        rejections : list of (int, wallet id, Rejection)
+            Row number, wallet id and Rejection of every purchase that would
+            have raised InsufficientCashError. Call `.error()` on a Rejection
+            to get the error.
+
+    Raises
+    ------
+    ValueError
+        If a row has no wallet id, a missing or non-finite cost, or an action
+        other than "buy" or "sell".
+        Chunks before the one holding that row have already been applied.
+    """
+    opening = opening or {}
+    wallet_ids = list(opening)
+    index = {wallet_id: i for i, wallet_id in enumerate(wallet_ids)}
+    storage = np.array([opening[wallet_id] for wallet_id in wallet_ids], np.float64)
+    book = WalletBook(storage, copy=False)
+    rejections = []
+
+    chunks = pd.read_csv(
+        path,
+        usecols=["wallet", "action", "cost", "number"],
+        dtype={"action": "category", "cost": np.float64, "number": np.int64},
+        chunksize=chunksize,
+    )
+    first_row = 0
+    for chunk in chunks:
+        # map each distinct wallet of the chunk to its position in the book
+        codes, uniques = pd.factorize(chunk["wallet"])
+        is_buy = (chunk["action"] == "buy").to_numpy()
+        bad = (codes < 0) | ~(is_buy | (chunk["action"] == "sell").to_numpy())
+        bad |= ~np.isfinite(chunk["cost"].to_numpy())
+        if bad.any():
+            row = np.flatnonzero(bad)[0]
+            raise ValueError(
+                f"Row {first_row + row} of the ledger needs a wallet id, a "
+                'finite cost and an action of "buy" or "sell".'
+            )
+        for wallet_id in uniques.tolist():
+            if wallet_id not in index:
+                index[wallet_id] = len(wallet_ids)
+                wallet_ids.append(wallet_id)
+        positions = np.array([index[w] for w in uniques.tolist()], dtype=np.intp)
+        ids = positions[codes]
+        if len(wallet_ids) > len(storage):
+            # double the storage so that growing the book stays amortized O(1)
+            grown = np.zeros(max(len(wallet_ids), 2 * len(storage)))
+            grown[: len(book)] = book.balances
+            storage = grown
+        if len(wallet_ids) > len(book):
+            book = WalletBook(storage[: len(wallet_ids)], copy=False)
+
+        costs = chunk["cost"].to_numpy()
+        numbers = chunk["number"].to_numpy()
+        before = np.empty(len(chunk))
+        failed = book.apply(ids, costs, numbers, is_buy, out_balances=before)
+        for row in np.flatnonzero(failed).tolist():
+            cost, number, balance = costs[row], numbers[row], before[row]
+            rejection = Rejection(cost.item(), number.item(), balance.item())
+            rejections.append((first_row + row, wallet_ids[ids[row]], rejection))
+        first_row += len(chunk)
+    return Ledger(book, wallet_ids, rejections)
+
+
+if __name__ == "__main__":
+    import io
+    import os
+    import tempfile
+    import time
+
+    from wallet import InsufficientCashError, Wallet
+
+    n_rows, n_wallets = 2_000_000, 50_000
+    rng = np.random.default_rng(2021)
+    frame = pd.DataFrame(
+        {
+            "wallet": rng.integers(0, n_wallets, n_rows),
+            "action": np.where(rng.random(n_rows) < 0.6, "buy", "sell"),
+            "cost": rng.integers(1, 5000, n_rows) / 100,
+            "number": rng.integers(1, 4, n_rows),
+        }
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ledger.csv")
+        frame.to_csv(path, index=False)
+        size = os.path.getsize(path)
+        tic = time.perf_counter()
+        ledger = from_ledger(path, chunksize=250_000)
+        elapsed = time.perf_counter() - tic
+    print(
+        f"loaded {n_rows:,} rows ({size / 2**20:.0f} MiB) into "
+        f"{len(ledger.book):,} wallets in {elapsed:.2f}s, "
+        f"{len(ledger.rejections):,} rejected"
+    )
+
+    wallets = {}
+    rejected = []
+    for row in frame.head(200_000).itertuples():
+        wallet = wallets.setdefault(row.wallet, Wallet(0.0))
+        if row.action == "sell":
+            wallet.sell_item(row.cost, row.number)
+            continue
+        try:
+            wallet.buy_item(row.cost, row.number)
+        except InsufficientCashError as error:
+            rejected.append((row.Index, str(error)))
+    head = from_ledger(io.StringIO(frame.head(200_000).to_csv(index=False)))
+    assert rejected == [(row, str(r.error())) for row, _, r in head.rejections]
+
+    bad_rows = ["1,sell,10,1\n1,refund,5,1\n", "1,BUY,10,1\n", ",sell,10,1\n"]
+    bad_rows += ["1,sell,,1\n", "1,sell,inf,1\n"]
+    for bad in bad_rows:
+        try:
+            from_ledger(io.StringIO("wallet,action,cost,number\n" + bad))
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted a bad ledger row: {bad!r}")
@@ -0,0 +1,199 @@
+# This module contains a class LimitedWallet, a Wallet that refuses purchases
+# once too much has been spent within a sliding time window.
+
+import time
+from collections import deque, namedtuple
+
+from wallet import Wallet
+
+
+class LimitedWallet(Wallet):
+    """A wallet with a limit on how much can be spent in a sliding window.
+
+    Recent purchases are kept in a deque in time order together with their
+    running total. Each purchase drops the ones that have left the window and
+    appends itself, so checking and updating the limit is amortized O(1).
+
+    Parameters
+    ----------
+    balance : number
+        Amount of starting cash.
+    limit : number
+        Most money that can be spent within any `window`.
+    window : float, optional
+        Length of the window in seconds, by default 24 hours.
+
+    Attributes
+    ----------
+    item : str
+        The type of item, a "Wallet"
+    balance : float
+        The amount of money currently in the wallet.
+    limit : number
+        Most money that can be spent within any window.
+    window : float
+        Length of the window in seconds.
+    """
+
+    def __init__(self, balance, limit, window=24 * 60 * 60):
+        """See help(LimitedWallet)"""
+        super().__init__(balance)
+        self.limit = limit
+        self.window = window
+        self._recent = deque()
+        self._recent_total = 0
+
+    def spent(self, when=None):
+        """Return the money spent in the window that ends at time `when`."""
+        when = time.time() if when is None else when
+        self._expire(when)
+        return self._recent_total
+
+    def _expire(self, when):
+        """Forget purchases made at or before `when - window`."""
+        recent = self._recent
+        if recent and when < recent[-1][0]:
+            raise ValueError(f"Purchase at {when} is earlier than {recent[-1][0]}.")
+        start = when - self.window
+        while recent and recent[0][0] <= start:
+            self._recent_total -= recent.popleft()[1]
+        if not recent:
+            # start again from an exact 0, so rounding errors cannot pile up
+            self._recent_total = 0
+
+    def _over_limit(self, total, when):
+        """Return a LimitRejection if `total` cannot be spent at time `when`."""
+        spent = self.spent(when)
+        if spent + total > self.limit:
+            return LimitRejection(total, spent, self.limit)
+        return None
+
+    def _check_limit(self, total, when):
+        """Raise SpendLimitError if `total` cannot be spent at time `when`."""
+        rejection = self._over_limit(total, when)
+        if rejection is not None:
+            raise rejection.error()
+
+    def _record(self, total, when):
+        self._recent.append((when, total))
+        self._recent_total += total
+
+    def buy_item(self, cost, number=1, when=None):
+        """Spend money and reduce your balance, see `Wallet.buy_item`.
+
+        Parameters
+        ----------
+        when : float, optional
+            Time of the purchase, by default now. Must not be earlier than
+            the previous purchase.
+
+        Raises
+        ------
+        SpendLimitError
+            If the purchase would exceed the spend limit.
+        InsufficientCashError
+            If you do not have enough money to spend.
+        """
+        when = time.time() if when is None else when
+        self._check_limit(cost * number, when)
+        super().buy_item(cost, number)
+        self._record(cost * number, when)
+
+    def try_buy(self, cost, number=1, when=None):
+        """Spend money if you can afford it, see `Wallet.try_buy`.
+
+        Returns
+        -------
+        Rejection, LimitRejection or None
+            None if the purchase went through, a LimitRejection if it would
+            exceed the spend limit and a Rejection if there is not enough cash.
+        """
+        when = time.time() if when is None else when
+        rejection = self._over_limit(cost * number, when)
+        if rejection is not None:
+            return rejection
+        rejection = super().try_buy(cost, number)
+        if rejection is None:
+            self._record(cost * number, when)
+        return rejection
+
+    def try_buy_many(self, items, when=None):
+        """Make many purchases in order, see `Wallet.try_buy_many`.
+
+        All purchases are made at time `when`, by default now. Each one
+        counts towards the limit of the ones after it, and purchases over the
+        limit are rejected, see `try_buy`.
+        """
+        when = time.time() if when is None else when
+        return [self.try_buy(cost, number, when) for cost, number in items]
+
+    def checkout(self, items, when=None):
+        """Buy a whole cart of items at once, see `Wallet.checkout`.
+
+        Raises
+        ------
+        SpendLimitError
+            If the cart would exceed the spend limit.
+        """
+        items = list(items)
+        when = time.time() if when is None else when
+        self._check_limit(sum(cost * number for cost, number in items), when)
+        total = super().checkout(items)
+        self._record(total, when)
+        return total
+
+
+class SpendLimitError(Exception):
+    """Custom error used when a purchase would exceed a spend limit."""
+
+    pass
+
+
+class LimitRejection(namedtuple("LimitRejection", ["total", "spent", "limit"])):
+    """A purchase that was refused because it would exceed a spend limit.
+
+    Attributes
+    ----------
+    total : number
+        The amount that could not be spent.
+    spent : number
+        The amount already spent in the window at the time of the purchase.
+    limit : number
+        The spend limit of the wallet.
+    """
+
+    __slots__ = ()
+
+    def error(self):
+        """Build the SpendLimitError that `LimitedWallet.buy_item` would raise."""
+        return SpendLimitError(
+            f"You can't spend ${self.total} as you have already spent "
+            f"${self.spent} of your ${self.limit} limit."
+        )
+
+
+if __name__ == "__main__":
+    import random
+
+    wallet = LimitedWallet(100, limit=5)
+    results = wallet.try_buy_many([(3, 1), (3, 1), (2, 1)], when=0)
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], LimitRejection)
+    assert wallet.balance == 95 and wallet.spent(0) == 5
+    assert isinstance(results[1].error(), SpendLimitError)
+
+    n_ops = 1_000_000
+    rng = random.Random(2021)
+    wallet = LimitedWallet(float("inf"), limit=5_000, window=3_600)
+    refused = 0
+    tic = time.perf_counter()
+    for t in range(n_ops):
+        try:
+            wallet.buy_item(rng.randint(1, 10), when=t)
+        except SpendLimitError:
+            refused += 1
+    elapsed = time.perf_counter() - tic
+    print(
+        f"{n_ops / elapsed:,.0f} limited purchases/s "
+        f"({refused:,} refused, {len(wallet._recent):,} in window)"
+    )
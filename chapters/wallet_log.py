@@ -0,0 +1,175 @@
+# This module contains a class LoggedWallets that records every transaction on
+# a set of wallets in an append-only write-ahead log, so balances survive a crash.
+
+import os
+import struct
+
+import numpy as np
+
+from wallet import Wallet
+
+OPEN, BUY, SELL = 0, 1, 2
+RECORD = struct.Struct("<Bqd")
+RECORD_DTYPE = np.dtype([("kind", "u1"), ("wallet_id", "<i8"), ("amount", "<f8")])
+
+
+class LoggedWallets:
+    """Wallets whose transactions are written to a write-ahead log.
+
+    Every successful `buy_item` and `sell_item` appends a fixed-size record to
+    the log. Records are buffered and written with a single fsync once
+    `batch_size` of them are pending (group commit), so a transaction is only
+    durable after the next `commit`. Opening an existing log replays it to
+    rebuild all balances.
+
+    Parameters
+    ----------
+    path : str or path-like
+        Location of the log file. It is created if it does not exist.
+    batch_size : int, optional
+        Number of records to buffer before committing, by default 64.
+
+    Attributes
+    ----------
+    item : str
+        The type of item, "LoggedWallets"
+    wallets : dict of int to Wallet
+        The wallets, keyed by wallet id.
+    """
+
+    item = "LoggedWallets"
+
+    def __init__(self, path, batch_size=64):
+        """See help(LoggedWallets)"""
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1.")
+        self.path = path
+        self.batch_size = batch_size
+        ids, balances = replay(path) if os.path.exists(path) else ([], [])
+        self.wallets = {
+            wallet_id: Wallet(balance)
+            for wallet_id, balance in zip(np.asarray(ids).tolist(), balances)
+        }
+        self._file = open(path, "ab")
+        # drop a torn record left by a crash so new records stay aligned
+        self._file.truncate(self._file.tell() // RECORD.size * RECORD.size)
+        self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __str__(self):
+        return f"LoggedWallets with {len(self.wallets)} wallets at {self.path}"
+
+    def open_wallet(self, wallet_id, balance):
+        """Create a new wallet with `balance` of starting cash."""
+        if wallet_id in self.wallets:
+            raise ValueError(f"Wallet {wallet_id} already exists.")
+        if wallet_id < 0:
+            raise ValueError("wallet_id must be non-negative.")
+        self.wallets[wallet_id] = Wallet(balance)
+        self._append(OPEN, wallet_id, balance)
+
+    def buy_item(self, wallet_id, cost, number=1):
+        """Spend money from a wallet and log it, see `Wallet.buy_item`.
+
+        Raises
+        ------
+        InsufficientCashError
+            If the wallet does not have enough money to spend. Nothing is
+            logged in that case.
+        """
+        self.wallets[wallet_id].buy_item(cost, number)
+        self._append(BUY, wallet_id, cost * number)
+
+    def sell_item(self, wallet_id, cost, number=1):
+        """Sell items from a wallet and log it, see `Wallet.sell_item`."""
+        self.wallets[wallet_id].sell_item(cost, number)
+        self._append(SELL, wallet_id, cost * number)
+
+    def _append(self, kind, wallet_id, amount):
+        self._buffer.append(RECORD.pack(kind, wallet_id, amount))
+        if len(self._buffer) >= self.batch_size:
+            self.commit()
+
+    def commit(self):
+        """Write all pending records and fsync the log."""
+        if not self._buffer:
+            return
+        self._file.write(b"".join(self._buffer))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._buffer = []
+
+    def close(self):
+        """Commit pending records and close the log."""
+        if not self._file.closed:
+            self.commit()
+            self._file.close()
+
+
+def replay(path):
+    """Rebuild wallet balances from a log file.
+
+    A partly written record at the end of the file, left by a crash during a
+    write, is ignored.
+
+    Parameters
+    ----------
+    path : str or path-like
+        Location of the log file.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        The wallet ids that were opened, and their balances.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    n_records = len(data) // RECORD_DTYPE.itemsize
+    records = np.frombuffer(data, dtype=RECORD_DTYPE, count=n_records)
+    signed = np.where(records["kind"] == BUY, -records["amount"], records["amount"])
+    # number the wallets densely, so a huge wallet id costs no memory;
+    # bincount adds the records of each wallet in log order, like the Wallet
+    # methods did, so the rebuilt balances match exactly
+    wallet_ids, index = np.unique(records["wallet_id"], return_inverse=True)
+    totals = np.bincount(index, weights=signed, minlength=len(wallet_ids))
+    opened = np.isin(wallet_ids, records["wallet_id"][records["kind"] == OPEN])
+    return wallet_ids[opened], totals[opened].tolist()
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    n_ops = 2_000
+    with tempfile.TemporaryDirectory() as tmp:
+        for batch_size in (1, 8, 64, 512):
+            path = os.path.join(tmp, f"wallets-{batch_size}.log")
+            tic = time.perf_counter()
+            with LoggedWallets(path, batch_size) as book:
+                for wallet_id in range(100):
+                    book.open_wallet(wallet_id, 1000)
+                for i in range(n_ops):
+                    book.sell_item(i % 100, 2)
+                    book.buy_item(i % 100, 1, 3)
+            elapsed = time.perf_counter() - tic
+            rate = (2 * n_ops + 100) / elapsed
+            print(f"batch size {batch_size:>3}: {rate:,.0f} durable transactions/s")
+
+            tic = time.perf_counter()
+            restored = LoggedWallets(path)
+            elapsed = time.perf_counter() - tic
+            assert all(w.balance == 980 for w in restored.wallets.values())
+            restored.close()
+        print(f"replay of {2 * n_ops + 100} records: {elapsed * 1000:.2f} ms")
+
+        path = os.path.join(tmp, "sparse.log")
+        with LoggedWallets(path) as book:
+            book.open_wallet(10**10, 50)
+            book.buy_item(10**10, 20)
+        with LoggedWallets(path) as restored:
+            assert restored.wallets[10**10].balance == 30
@@ -0,0 +1,232 @@
+# This module contains opt-in metrics for Wallet: counters of buys, sells,
+# rejections and cash moved, and latency histograms. Nothing is measured until
+# `enable` is called, and `disable` puts the original Wallet methods back, so
+# there is no cost at all while metrics are off.
+#
+# Run this module to measure the overhead of enabled metrics.
+
+import time
+from contextlib import contextmanager
+
+from wallet import InsufficientCashError, Wallet
+
+_ORIGINAL = {
+    name: getattr(Wallet, name)
+    for name in ("buy_item", "sell_item", "try_buy", "try_buy_many", "checkout")
+}
+
+
+class LatencyHistogram:
+    """A histogram of latencies in power-of-two nanosecond buckets.
+
+    Bucket `k` counts the latencies from 2**(k-1) up to 2**k - 1 ns.
+    """
+
+    def __init__(self):
+        """See help(LatencyHistogram)"""
+        self.buckets = [0] * 65
+        self.total_ns = 0
+
+    def record(self, ns):
+        """Add one latency, in nanoseconds."""
+        self.buckets[ns.bit_length()] += 1
+        self.total_ns += ns
+
+    @property
+    def count(self):
+        """The number of latencies recorded."""
+        return sum(self.buckets)
+
+    def percentile(self, q):
+        """Return an upper bound in ns for the q-th percentile latency."""
+        target = q / 100 * self.count
+        seen = 0
+        for k, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return 2**k - 1
+        return 0
+
+
+class WalletMetrics:
+    """Counters and latency histograms for Wallet operations.
+
+    Attributes
+    ----------
+    buys, sells, rejections : int
+        Number of purchases, sales and refused purchases. A cart bought with
+        `Wallet.checkout` counts as one purchase.
+    cash_spent, cash_earned : number
+        Total money spent on purchases and earned from sales.
+    latency : dict of str to LatencyHistogram
+        Latency of each instrumented Wallet method.
+    """
+
+    def __init__(self):
+        """See help(WalletMetrics)"""
+        self.buys = 0
+        self.sells = 0
+        self.rejections = 0
+        self.cash_spent = 0
+        self.cash_earned = 0
+        self.latency = {name: LatencyHistogram() for name in _ORIGINAL}
+
+    def to_text(self):
+        """Return a snapshot in the Prometheus text exposition format."""
+        lines = [
+            f"wallet_buys_total {self.buys}",
+            f"wallet_sells_total {self.sells}",
+            f"wallet_rejections_total {self.rejections}",
+            f"wallet_cash_spent_total {self.cash_spent}",
+            f"wallet_cash_earned_total {self.cash_earned}",
+        ]
+        for name, histogram in self.latency.items():
+            metric = f"wallet_{name}_latency_ns"
+            cumulative = 0
+            for k, n in enumerate(histogram.buckets):
+                cumulative += n
+                if n:
+                    lines.append(f'{metric}_bucket{{le="{2**k - 1}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram.count}')
+            lines.append(f"{metric}_sum {histogram.total_ns}")
+            lines.append(f"{metric}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def enable(metrics=None):
+    """Start recording metrics for every Wallet.
+
+    Parameters
+    ----------
+    metrics : WalletMetrics, optional
+        Where to record, by default a new WalletMetrics.
+
+    Returns
+    -------
+    WalletMetrics
+        The metrics being recorded.
+    """
+    metrics = WalletMetrics() if metrics is None else metrics
+    clock = time.perf_counter_ns
+    buy_item, sell_item, try_buy, try_buy_many, checkout = _ORIGINAL.values()
+    # bind everything the wrappers touch to locals, they run on every call
+    record = {name: histogram.record for name, histogram in metrics.latency.items()}
+    record_buy_item, record_sell_item = record["buy_item"], record["sell_item"]
+    record_try_buy, record_try_buy_many = record["try_buy"], record["try_buy_many"]
+    record_checkout = record["checkout"]
+
+    def metered_buy_item(self, cost, number=1):
+        tic = clock()
+        try:
+            buy_item(self, cost, number)
+        except InsufficientCashError:
+            record_buy_item(clock() - tic)
+            metrics.rejections += 1
+            raise
+        record_buy_item(clock() - tic)
+        metrics.buys += 1
+        metrics.cash_spent += cost * number
+
+    def metered_sell_item(self, cost, number=1):
+        tic = clock()
+        sell_item(self, cost, number)
+        record_sell_item(clock() - tic)
+        metrics.sells += 1
+        metrics.cash_earned += cost * number
+
+    def metered_try_buy(self, cost, number=1):
+        tic = clock()
+        rejection = try_buy(self, cost, number)
+        record_try_buy(clock() - tic)
+        if rejection is None:
+            metrics.buys += 1
+            metrics.cash_spent += cost * number
+        else:
+            metrics.rejections += 1
+        return rejection
+
+    def metered_try_buy_many(self, items):
+        tic = clock()
+        start = self.balance
+        results = try_buy_many(self, items)
+        record_try_buy_many(clock() - tic)
+        rejected = sum(map(bool, results))
+        metrics.buys += len(results) - rejected
+        metrics.rejections += rejected
+        metrics.cash_spent += start - self.balance
+        return results
+
+    def metered_checkout(self, items):
+        tic = clock()
+        try:
+            total = checkout(self, items)
+        except InsufficientCashError:
+            record_checkout(clock() - tic)
+            metrics.rejections += 1
+            raise
+        record_checkout(clock() - tic)
+        metrics.buys += 1
+        metrics.cash_spent += total
+        return total
+
+    metered = {
+        "buy_item": metered_buy_item,
+        "sell_item": metered_sell_item,
+        "try_buy": metered_try_buy,
+        "try_buy_many": metered_try_buy_many,
+        "checkout": metered_checkout,
+    }
+    for name, method in metered.items():
+        method.__name__ = name
+        method.__doc__ = _ORIGINAL[name].__doc__
+        setattr(Wallet, name, method)
+    return metrics
+
+
+def disable():
+    """Stop recording metrics and restore the original Wallet methods."""
+    for name, method in _ORIGINAL.items():
+        setattr(Wallet, name, method)
+
+
+@contextmanager
+def recording(metrics=None):
+    """Record metrics for every Wallet inside a `with` block."""
+    metrics = enable(metrics)
+    try:
+        yield metrics
+    finally:
+        disable()
+
+
+if __name__ == "__main__":
+    import timeit
+
+    with recording() as metrics:
+        wallet = Wallet(100)
+        wallet.checkout([(30, 1), (20, 1)])
+        try:
+            wallet.checkout([(40, 2)])
+        except InsufficientCashError:
+            pass
+    assert (metrics.buys, metrics.rejections, metrics.cash_spent) == (1, 1, 50)
+    assert metrics.latency["checkout"].count == 2
+
+    wallet = Wallet(1e12)
+    calls = {
+        "buy_item": "wallet.buy_item(1.0)",
+        "sell_item": "wallet.sell_item(1.0)",
+        "try_buy": "wallet.try_buy(1.0)",
+        "checkout": "wallet.checkout([(1.0, 1)])",
+    }
+    n = 1_000_000
+    metrics = WalletMetrics()
+    for name, stmt in calls.items():
+        off = min(timeit.repeat(stmt, number=n, repeat=5, globals=globals()))
+        with recording(metrics):
+            on = min(timeit.repeat(stmt, number=n, repeat=5, globals=globals()))
+        print(
+            f"{name:<10} disabled {off / n * 1e9:6.0f} ns/call, "
+            f"enabled {on / n * 1e9:6.0f} ns/call (+{(on - off) / n * 1e9:.0f} ns)"
+        )
+    print(metrics.to_text(), end="")
@@ -0,0 +1,171 @@
+# This module contains a class SnapshotWalletBook, a WalletBook that publishes
+# a consistent, read-only version of all balances after every write, so readers
+# never see a half-applied batch and never block writers.
+
+import threading
+
+import numpy as np
+
+from wallet_book import WalletBook
+
+
+class BalanceSnapshot:
+    """A read-only, point-in-time view of every balance in a WalletBook.
+
+    The balances are stored as a tuple of read-only pages. Versions share the
+    pages that did not change between them, and a version is freed as soon
+    as no reader holds on to it.
+
+    Attributes
+    ----------
+    version : int
+        Number of writes published before this snapshot, starting at 0.
+    pages : tuple of numpy.ndarray
+        Consecutive read-only slices of the balances.
+    """
+
+    def __init__(self, pages, version, page_size):
+        """See help(BalanceSnapshot)"""
+        self.pages = pages
+        self.version = version
+        self.page_size = page_size
+
+    def __len__(self):
+        return sum(len(page) for page in self.pages)
+
+    def __getitem__(self, wallet_id):
+        page, offset = divmod(wallet_id, self.page_size)
+        return self.pages[page][offset]
+
+    def __str__(self):
+        return f"Balances of {len(self)} wallets at version {self.version}"
+
+    def to_array(self):
+        """Return all balances as one new array."""
+        return np.concatenate(self.pages)
+
+    def total(self):
+        """Return the sum of all balances."""
+        return sum(page.sum() for page in self.pages)
+
+
+class SnapshotWalletBook(WalletBook):
+    """A WalletBook whose readers get consistent snapshots without locking.
+
+    Writers apply batches to the live balance array under a lock, then copy
+    only the pages the batch touched into a new BalanceSnapshot and publish it
+    with a single reference assignment. `snapshot` just reads that reference.
+
+    Parameters
+    ----------
+    balances : array-like
+        Amount of starting cash for each wallet.
+    page_size : int, optional
+        Number of balances per page, by default 4096.
+    dtype : data-type, optional
+        Data type of the balance array, by default float64.
+
+    Attributes
+    ----------
+    item : str
+        The type of item, a "SnapshotWalletBook"
+    """
+
+    item = "SnapshotWalletBook"
+
+    def __init__(self, balances, page_size=4096, dtype=np.float64):
+        """See help(SnapshotWalletBook)"""
+        super().__init__(balances, dtype=dtype)
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        n_pages = -(-len(self) // page_size)
+        self._published = BalanceSnapshot((None,) * n_pages, -1, page_size)
+        self._publish(range(n_pages))
+
+    def snapshot(self):
+        """Return the latest published BalanceSnapshot, without locking."""
+        return self._published
+
+    def _publish(self, dirty_pages):
+        """Publish a new version with fresh copies of `dirty_pages`."""
+        pages = list(self._published.pages)
+        for page in dirty_pages:
+            lo = page * self.page_size
+            copy = self.balances[lo : lo + self.page_size].copy()
+            copy.flags.writeable = False
+            pages[page] = copy
+        version = self._published.version + 1
+        self._published = BalanceSnapshot(tuple(pages), version, self.page_size)
+
+    def _write(self, method, ids, *args):
+        """Apply a batch with `method` and publish the pages it touched."""
+        with self._lock:
+            result = method(ids, *args)
+            ids = np.asarray(ids, dtype=np.intp)
+            self._publish(np.unique(ids // self.page_size).tolist())
+        return result
+
+    def buy_items(self, ids, costs, numbers=1):
+        """Spend money from many wallets, see `WalletBook.buy_items`."""
+        return self._write(super().buy_items, ids, costs, numbers)
+
+    def sell_items(self, ids, costs, numbers=1):
+        """Sell items from many wallets, see `WalletBook.sell_items`."""
+        self._write(super().sell_items, ids, costs, numbers)
+
+    def apply(self, ids, costs, numbers=1, is_buy=True, out_balances=None):
+        """Apply a mixed batch in order, see `WalletBook.apply`."""
+        return self._write(super().apply, ids, costs, numbers, is_buy, out_balances)
+
+
+if __name__ == "__main__":
+    import time
+
+    # every write method publishes a new version, including those that
+    # WalletBook implements on top of others
+    book = SnapshotWalletBook([10.0, 20.0, 30.0], page_size=2)
+    assert book.buy_items([0, 2], [1.0, 40.0]).tolist() == [False, True]
+    assert book.snapshot().to_array().tolist() == [9.0, 20.0, 30.0]
+    assert book.checkout([1, 2], [0, 0, 1], [5.0, 10.0, 31.0]).tolist() == [False, True]
+    assert book.snapshot().to_array().tolist() == [9.0, 5.0, 30.0]
+    book.sell_items([2], [2.0])
+    assert book.snapshot().to_array().tolist() == [9.0, 5.0, 32.0]
+    assert book.snapshot().version == 3
+
+    n_wallets, batch, duration, n_readers = 1_000_000, 1_000, 3.0, 2
+    rng = np.random.default_rng(2021)
+    book = SnapshotWalletBook(rng.uniform(0, 100, n_wallets))
+    totals = {0: book.balances.sum()}
+    stop = threading.Event()
+    counts = {"writes": 0, "reads": 0}
+
+    def write():
+        rng = np.random.default_rng(1)
+        while not stop.is_set():
+            ids = rng.integers(0, n_wallets, batch)
+            book.apply(ids, rng.uniform(0, 20, batch), is_buy=rng.random(batch) < 0.5)
+            totals[book.snapshot().version] = book.balances.sum()
+            counts["writes"] += 1
+
+    def read():
+        while not stop.is_set():
+            snapshot = book.snapshot()
+            total = snapshot.total()
+            while snapshot.version not in totals:
+                time.sleep(0)
+            assert np.isclose(total, totals[snapshot.version]), "inconsistent read"
+            counts["reads"] += 1
+
+    threads = [threading.Thread(target=write)]
+    threads += [threading.Thread(target=read) for _ in range(n_readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    print(
+        f"{counts['writes'] / duration:,.0f} write batches/s of {batch} rows, "
+        f"{counts['reads'] / duration:,.0f} consistent full reads/s "
+        f"from {n_readers} readers"
+    )
@@ -0,0 +1,121 @@
+# This module contains a pandas accessor that applies a DataFrame of wallet
+# transactions with vectorized grouped cumulative sums. Importing it registers
+# `df.wallet`.
+#
+# The DataFrame needs the same columns as a ledger (see wallet_ledger.py):
+#     wallet, action ("buy" or "sell"), cost, number
+
+import numpy as np
+import pandas as pd
+
+
+@pd.api.extensions.register_dataframe_accessor("wallet")
+class WalletAccessor:
+    """Apply the transactions in a DataFrame to many wallets at once.
+
+    Parameters
+    ----------
+    frame : pandas.DataFrame
+        Transactions in order, with columns wallet, action, cost and number.
+    """
+
+    columns = ["wallet", "action", "cost", "number"]
+
+    def __init__(self, frame):
+        """See help(WalletAccessor)"""
+        missing = set(self.columns) - set(frame.columns)
+        if missing:
+            raise AttributeError(f"Missing wallet columns: {sorted(missing)}.")
+        self._frame = frame
+
+    def apply(self, start_balances=None):
+        """Compute the running balance of every wallet after each row.
+
+        The balances are a grouped cumulative sum over all rows, so they match
+        calling `Wallet.buy_item` and `Wallet.sell_item` row by row (up to
+        float rounding, as pandas sums with compensation) until the first
+        purchase a wallet cannot afford. That row is flagged, and the balances
+        after it assume it went through anyway.
+
+        Parameters
+        ----------
+        start_balances : dict or pandas.Series, optional
+            Starting balance of each wallet. Wallets that are missing start
+            with 0.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Indexed like the transactions, with columns
+            balance : the wallet's balance after the row.
+            rejected : True on the first row of each wallet that would raise
+            InsufficientCashError.
+        """
+        frame = self._frame
+        action = frame["action"]
+        is_buy = (action == "buy").to_numpy()
+        if not (is_buy | (action == "sell").to_numpy()).all():
+            raise ValueError('action must be "buy" or "sell".')
+
+        amounts = frame["cost"].to_numpy(np.float64) * frame["number"].to_numpy()
+        signed = np.where(is_buy, -amounts, amounts)
+        # the cumulative sum of each wallet starts from its starting balance
+        if start_balances is None:
+            start_balances = {}
+        start = frame["wallet"].map(pd.Series(start_balances, dtype=float))
+        first = (~frame["wallet"].duplicated()).to_numpy()
+        signed[first] += start.fillna(0).to_numpy()[first]
+        balance = (
+            pd.Series(signed, index=frame.index)
+            .groupby(frame["wallet"], sort=False)
+            .cumsum()
+        )
+
+        overdrawn = pd.Series(is_buy & (balance.to_numpy() < 0), index=frame.index)
+        n_overdrawn = overdrawn.groupby(frame["wallet"], sort=False).cumsum()
+        rejected = overdrawn & (n_overdrawn == 1)
+        return pd.DataFrame({"balance": balance, "rejected": rejected})
+
+
+if __name__ == "__main__":
+    import time
+
+    from wallet import InsufficientCashError, Wallet
+
+    n_rows, n_wallets = 2_000_000, 50_000
+    rng = np.random.default_rng(2021)
+    frame = pd.DataFrame(
+        {
+            "wallet": rng.integers(0, n_wallets, n_rows),
+            "action": np.where(rng.random(n_rows) < 0.5, "buy", "sell"),
+            "cost": rng.integers(1, 5000, n_rows) / 100,
+            "number": rng.integers(1, 4, n_rows),
+        }
+    )
+    start = {w: 100.0 for w in range(0, n_wallets, 2)}
+
+    tic = time.perf_counter()
+    result = frame.wallet.apply(start)
+    elapsed = time.perf_counter() - tic
+    print(f"applied {n_rows:,} rows in {elapsed:.2f}s")
+
+    head = frame.head(100_000)
+    checked = head.wallet.apply(start)
+    wallets = {}
+    stopped = set()
+    for row in head.itertuples():
+        if row.wallet in stopped:
+            continue
+        opening = start.get(row.wallet, 0.0)
+        wallet = wallets.setdefault(row.wallet, Wallet(opening))
+        try:
+            if row.action == "buy":
+                wallet.buy_item(row.cost, row.number)
+            else:
+                wallet.sell_item(row.cost, row.number)
+        except InsufficientCashError:
+            assert checked.at[row.Index, "rejected"]
+            stopped.add(row.wallet)
+            continue
+        assert np.isclose(checked.at[row.Index, "balance"], wallet.balance)
+    assert checked["rejected"].sum() == len(stopped)
@@ -0,0 +1,242 @@
+# This module contains a function reconcile that checks wallet ledgers against
+# stored balances, splitting the wallets across a pool of worker processes.
+#
+# Amounts are integer cents (see compact_wallet.to_cents), with purchases
+# negative and sales positive, so every sum is exact.
+
+import multiprocessing as mp
+from collections import namedtuple
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+Reconciliation = namedtuple("Reconciliation", ["mismatched", "expected", "overdrawn"])
+
+# the shared arrays of a worker process: the raw ledger columns, the same
+# columns grouped by part, and the opening and stored balances
+_shared = {}
+_blocks = []
+COLUMNS = ("wallets", "amounts", "part_wallets", "part_amounts", "opening", "stored")
+
+
+def _reconcile_range(wallets, amounts, opening, stored, lo):
+    """Reconcile the events of the wallets with ids from `lo` onwards.
+
+    `wallets` and `amounts` hold only these wallets' events, in ledger order,
+    and `opening` and `stored` hold only their balances.
+    """
+    ids = wallets - lo
+    order = np.argsort(ids, kind="stable")
+    ids, moved = ids[order], amounts[order]
+
+    # running balance of each event: its wallet's opening balance plus the
+    # cumulative sum of the wallet's events so far
+    total = np.cumsum(moved)
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]]) if len(ids) else ids
+    before_group = np.r_[0, total][starts]
+    sizes = np.diff(np.r_[starts, len(ids)])
+    running = opening[ids] + total - np.repeat(before_group, sizes)
+
+    final = opening.copy()
+    if len(ids):
+        final[ids[starts]] += np.add.reduceat(moved, starts)
+    mismatched = np.flatnonzero(final != stored)
+    overdrawn = np.unique(ids[(moved < 0) & (running < 0)])
+    return mismatched + lo, final[mismatched], overdrawn + lo
+
+
+def _attach(names, shapes):
+    for column, name in names.items():
+        shm = SharedMemory(name=name)
+        _blocks.append(shm)
+        _shared[column] = np.ndarray(shapes[column], np.int64, buffer=shm.buf)
+
+
+def _group_chunk(task):
+    """Group the events from `start` to `stop` by part, in place.
+
+    The chunk's events are written, part by part and in ledger order within
+    each part, to the same positions of the part_* columns. Returns the
+    number of events of each part.
+    """
+    start, stop, bounds = task
+    wallets = _shared["wallets"][start:stop]
+    if len(wallets) and (wallets.min() < 0 or wallets.max() >= bounds[-1]):
+        raise IndexError("wallet id out of range.")
+    # a stable argsort of 16-bit keys is a linear-time radix sort
+    parts = (np.searchsorted(bounds, wallets, side="right") - 1).astype(np.uint16)
+    order = np.argsort(parts, kind="stable")
+    _shared["part_wallets"][start:stop] = wallets[order]
+    _shared["part_amounts"][start:stop] = _shared["amounts"][start:stop][order]
+    return np.bincount(parts, minlength=len(bounds) - 1)
+
+
+def _reconcile_part(task):
+    """Reconcile one part from its slice of every grouped chunk."""
+    slices, lo, hi = task
+    wallets = np.concatenate([_shared["part_wallets"][a:b] for a, b in slices])
+    amounts = np.concatenate([_shared["part_amounts"][a:b] for a, b in slices])
+    opening, stored = _shared["opening"][lo:hi], _shared["stored"][lo:hi]
+    return _reconcile_range(wallets, amounts, opening, stored, lo)
+
+
+def _part_tasks(counts, chunk_edges, bounds):
+    """Return the tasks of `_reconcile_part` from the counts of each chunk."""
+    counts = np.array(counts)
+    starts = chunk_edges[:-1, None] + np.cumsum(counts, axis=1) - counts
+    ends = starts + counts
+    bounds = bounds.tolist()
+    return [
+        (list(zip(starts[:, k].tolist(), ends[:, k].tolist())), lo, hi)
+        for k, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:]))
+    ]
+
+
+def reconcile(wallets, amounts, opening, stored, n_workers=None, n_parts=None):
+    """Replay wallet ledgers and compare them with stored balances.
+
+    Wallet ids are split into `n_parts` contiguous ranges. The ledger is put
+    in shared memory and cut into chunks. Workers first group each chunk by
+    range with a linear-time radix sort, then replay the events of one range
+    at a time with vectorized sums, so the parent does almost no work.
+
+    Parameters
+    ----------
+    wallets : array-like of int
+        Wallet id of each ledger event, from 0 to len(stored) - 1.
+    amounts : array-like of int
+        Cents moved by each event: negative for purchases, positive for sales.
+    opening : array-like of int
+        Opening balance of each wallet, in cents.
+    stored : array-like of int
+        Stored balance of each wallet, in cents.
+    n_workers : int, optional
+        Number of worker processes, by default the number of CPUs. With 1,
+        everything runs in the calling process.
+    n_parts : int, optional
+        Number of wallet ranges, by default 4 per worker, at most 65,535.
+
+    Returns
+    -------
+    Reconciliation
+        A namedtuple of
+        mismatched : ids of wallets whose ledger does not sum to `stored`.
+        expected : the balance the ledger gives each mismatched wallet.
+        overdrawn : ids of wallets whose ledger has a purchase that would
+        have raised InsufficientCashError.
+
+    Raises
+    ------
+    IndexError
+        If a wallet id is negative or not less than len(stored).
+    """
+    columns = {
+        "wallets": np.ascontiguousarray(wallets, dtype=np.int64),
+        "amounts": np.ascontiguousarray(amounts, dtype=np.int64),
+        "opening": np.ascontiguousarray(opening, dtype=np.int64),
+        "stored": np.ascontiguousarray(stored, dtype=np.int64),
+    }
+    n_events, n_wallets = len(columns["wallets"]), len(columns["stored"])
+    n_workers = n_workers or mp.cpu_count()
+    n_parts = n_parts or 4 * n_workers
+    if not 0 < n_parts < 1 << 16:
+        raise ValueError("n_parts must be between 1 and 65,535.")
+    shapes = {column: (n_events,) for column in COLUMNS[:4]}
+    shapes.update(opening=(n_wallets,), stored=(n_wallets,))
+
+    # the ledger is cut into chunks; each chunk groups its own events by part,
+    # and a part then takes its slice of every chunk, in chunk order
+    bounds = np.linspace(0, n_wallets, n_parts + 1).astype(np.int64)
+    chunk_edges = np.linspace(0, n_events, 4 * n_workers + 1).astype(np.int64)
+    chunk_tasks = [
+        (start, stop, bounds)
+        for start, stop in zip(chunk_edges[:-1].tolist(), chunk_edges[1:].tolist())
+    ]
+
+    if n_workers == 1:
+        _shared.update(columns)
+        _shared["part_wallets"] = np.empty(n_events, np.int64)
+        _shared["part_amounts"] = np.empty(n_events, np.int64)
+        try:
+            counts = [_group_chunk(task) for task in chunk_tasks]
+            part_tasks = _part_tasks(counts, chunk_edges, bounds)
+            results = [_reconcile_part(task) for task in part_tasks]
+        finally:
+            _shared.clear()
+    else:
+        blocks = {}
+        try:
+            # the parent only publishes the raw columns; all grouping and
+            # replaying happens in the workers
+            for column in COLUMNS:
+                size = max(1, 8 * shapes[column][0])
+                blocks[column] = SharedMemory(create=True, size=size)
+                if column in columns:
+                    shared = np.ndarray(shapes[column], np.int64, blocks[column].buf)
+                    shared[:] = columns[column]
+            names = {column: shm.name for column, shm in blocks.items()}
+            with mp.Pool(n_workers, _attach, (names, shapes)) as pool:
+                counts = pool.map(_group_chunk, chunk_tasks)
+                part_tasks = _part_tasks(counts, chunk_edges, bounds)
+                results = pool.map(_reconcile_part, part_tasks)
+        finally:
+            for shm in blocks.values():
+                shm.close()
+                shm.unlink()
+
+    mismatched, expected, overdrawn = zip(*results)
+    return Reconciliation(
+        np.concatenate(mismatched), np.concatenate(expected), np.concatenate(overdrawn)
+    )
+
+
+if __name__ == "__main__":
+    import time
+
+    from compact_wallet import CompactWallet, to_cents
+    from wallet import InsufficientCashError
+
+    # check against CompactWallet on a small ledger
+    rng = np.random.default_rng(2021)
+    n_wallets, n_events = 200, 5_000
+    wallets = rng.integers(0, n_wallets, n_events)
+    signs = np.where(rng.random(n_events) < 0.5, -1, 1)
+    amounts = rng.integers(1, 3_000, n_events) * signs
+    opening = rng.integers(0, 10_000, n_wallets)
+    replayed = [CompactWallet(cents / 100) for cents in opening.tolist()]
+    overdrawn = set()
+    for wallet_id, cents in zip(wallets.tolist(), amounts.tolist()):
+        try:
+            if cents < 0:
+                replayed[wallet_id].buy_item(-cents / 100)
+            else:
+                replayed[wallet_id].sell_item(cents / 100)
+        except InsufficientCashError:
+            overdrawn.add(wallet_id)
+            replayed[wallet_id].cents += cents
+    stored = np.array([wallet.cents for wallet in replayed])
+    stored[[3, 7]] += to_cents(0.01)
+    for n_workers in (1, 2):
+        result = reconcile(wallets, amounts, opening, stored, n_workers)
+        assert result.mismatched.tolist() == [3, 7]
+        assert set(result.overdrawn.tolist()) == overdrawn
+    for bad_id, n_workers in ((n_wallets, 1), (-1, 1), (n_wallets, 2)):
+        bad = wallets.copy()
+        bad[10] = bad_id
+        try:
+            reconcile(bad, amounts, opening, stored, n_workers)
+        except IndexError:
+            continue
+        raise AssertionError(f"accepted wallet id {bad_id}")
+
+    n_wallets, n_events = 1_000_000, 20_000_000
+    wallets = rng.integers(0, n_wallets, n_events)
+    amounts = rng.integers(-5_000, 5_000, n_events)
+    opening = rng.integers(0, 100_000, n_wallets)
+    stored = opening + np.bincount(wallets, amounts, n_wallets).astype(np.int64)
+    for n_workers in range(1, max(4, mp.cpu_count()) + 1):
+        tic = time.perf_counter()
+        result = reconcile(wallets, amounts, opening, stored, n_workers)
+        elapsed = time.perf_counter() - tic
+        assert len(result.mismatched) == 0
+        print(f"{n_workers:>2} processes: {n_events / elapsed:,.0f} events/s")
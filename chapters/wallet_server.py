@@ -0,0 +1,264 @@
+# This module contains an asyncio TCP server that exposes wallets over a small
+# binary protocol, and a client that pipelines and batches its requests.
+#
+# Every request is a fixed-size frame REQUEST and gets one RESPONSE frame with
+# the same request id. Clients may send many requests without waiting, and
+# the server answers everything it has read with a single write.
+#
+# Run this module for a load test against a server on localhost.
+
+import asyncio
+import struct
+
+from wallet import Rejection, Wallet
+
+BUY, SELL, BALANCE = 1, 2, 3
+OK, INSUFFICIENT_CASH, UNKNOWN_WALLET, BAD_REQUEST = 0, 1, 2, 3
+# request id, operation, wallet id, cost, number
+REQUEST = struct.Struct("<IBqdq")
+# request id, status, balance after the request
+RESPONSE = struct.Struct("<IBd")
+
+
+class WalletServer:
+    """Serve a set of wallets over TCP.
+
+    Parameters
+    ----------
+    balances : dict or iterable of number
+        Amount of starting cash for each wallet. A dict maps wallet ids to
+        balances; any other iterable uses positions as wallet ids.
+
+    Attributes
+    ----------
+    item : str
+        The type of item, a "WalletServer"
+    wallets : dict of int to Wallet
+        The wallets being served.
+    """
+
+    item = "WalletServer"
+
+    def __init__(self, balances):
+        """See help(WalletServer)"""
+        if not isinstance(balances, dict):
+            balances = dict(enumerate(balances))
+        self.wallets = {key: Wallet(value) for key, value in balances.items()}
+        self._server = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start listening and return the (host, port) the server is bound to."""
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        """Stop listening and wait for the server to shut down."""
+        self._server.close()
+        await self._server.wait_closed()
+
+    def _handle(self, request_id, op, wallet_id, cost, number):
+        """Apply one request and return its response frame."""
+        wallet = self.wallets.get(wallet_id)
+        if wallet is None:
+            return RESPONSE.pack(request_id, UNKNOWN_WALLET, 0.0)
+        if op == BUY:
+            status = OK if wallet.try_buy(cost, number) is None else INSUFFICIENT_CASH
+        elif op == SELL:
+            wallet.sell_item(cost, number)
+            status = OK
+        elif op == BALANCE:
+            status = OK
+        else:
+            status = BAD_REQUEST
+        return RESPONSE.pack(request_id, status, wallet.balance)
+
+    async def _serve(self, reader, writer):
+        pending = b""
+        size = REQUEST.size
+        try:
+            while data := await reader.read(1 << 16):
+                pending += data
+                n_whole = len(pending) // size * size
+                writer.write(
+                    b"".join(
+                        self._handle(*request)
+                        for request in REQUEST.iter_unpack(pending[:n_whole])
+                    )
+                )
+                pending = pending[n_whole:]
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+class WalletClient:
+    """Call a WalletServer, pipelining and batching requests.
+
+    Requests made during one event-loop tick are sent together in one write,
+    and any number of requests can be in flight at once.
+    """
+
+    item = "WalletClient"
+
+    def __init__(self):
+        """See help(WalletClient)"""
+        self._reader = self._writer = self._listener = None
+        self._next_id = 0
+        self._in_flight = {}
+        self._outgoing = []
+
+    async def connect(self, host, port):
+        """Open the connection to a server."""
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+        self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def close(self):
+        """Close the connection."""
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._listener.cancel()
+
+    def _send(self, op, wallet_id, cost=0.0, number=0):
+        """Queue a request and return the future of its response."""
+        loop = asyncio.get_running_loop()
+        if not self._outgoing:
+            loop.call_soon(self._flush)
+        request_id = self._next_id
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+        future = loop.create_future()
+        self._in_flight[request_id] = (future, op, wallet_id, cost, number)
+        self._outgoing.append(REQUEST.pack(request_id, op, wallet_id, cost, number))
+        return future
+
+    def _flush(self):
+        self._writer.write(b"".join(self._outgoing))
+        self._outgoing = []
+
+    async def _listen(self):
+        pending = b""
+        size = RESPONSE.size
+        try:
+            while data := await self._reader.read(1 << 16):
+                pending += data
+                n_whole = len(pending) // size * size
+                for response in RESPONSE.iter_unpack(pending[:n_whole]):
+                    self._resolve(*response)
+                pending = pending[n_whole:]
+        except ConnectionError:
+            pass
+        for future, *_ in self._in_flight.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Connection closed."))
+
+    def _resolve(self, request_id, status, balance):
+        future, op, wallet_id, cost, number = self._in_flight.pop(request_id)
+        if future.done():
+            return
+        if status == OK:
+            future.set_result(balance)
+        elif status == INSUFFICIENT_CASH:
+            future.set_exception(Rejection(cost, number, balance).error())
+        elif status == UNKNOWN_WALLET:
+            future.set_exception(KeyError(wallet_id))
+        else:
+            future.set_exception(ValueError(f"Bad request operation {op}."))
+
+    def buy_item(self, wallet_id, cost, number=1):
+        """Spend money from a wallet, see `Wallet.buy_item`.
+
+        Returns
+        -------
+        asyncio.Future
+            Resolves to the new balance, or raises InsufficientCashError.
+        """
+        return self._send(BUY, wallet_id, cost, number)
+
+    def sell_item(self, wallet_id, cost, number=1):
+        """Sell items from a wallet, see `Wallet.sell_item`.
+
+        Returns
+        -------
+        asyncio.Future
+            Resolves to the new balance.
+        """
+        return self._send(SELL, wallet_id, cost, number)
+
+    def balance(self, wallet_id):
+        """Return a future of the current balance of a wallet."""
+        return self._send(BALANCE, wallet_id)
+
+
+async def load_test(n_wallets=1_000, n_clients=4, depth=256, n_requests=200_000):
+    """Run clients against a local server and measure throughput and latency.
+
+    Parameters
+    ----------
+    n_wallets : int, optional
+        Number of wallets on the server, by default 1,000.
+    n_clients : int, optional
+        Number of client connections, by default 4.
+    depth : int, optional
+        Requests each client keeps in flight, by default 256.
+    n_requests : int, optional
+        Total number of requests, by default 200,000.
+
+    Returns
+    -------
+    dict
+        Requests per second and latency percentiles in microseconds.
+    """
+    import random
+    import time
+
+    from wallet import InsufficientCashError
+
+    server = WalletServer([100.0] * n_wallets)
+    host, port = await server.start()
+    latencies = []
+
+    async def run_client(seed, n):
+        rng = random.Random(seed)
+        client = WalletClient()
+        await client.connect(host, port)
+
+        async def one(wallet_id, cost):
+            tic = time.perf_counter()
+            try:
+                if rng.random() < 0.5:
+                    await client.buy_item(wallet_id, cost)
+                else:
+                    await client.sell_item(wallet_id, cost)
+            except InsufficientCashError:
+                pass
+            latencies.append(time.perf_counter() - tic)
+
+        for start in range(0, n, depth):
+            count = min(depth, n - start)
+            calls = [
+                one(rng.randrange(n_wallets), rng.randint(1, 20)) for _ in range(count)
+            ]
+            await asyncio.gather(*calls)
+        await client.close()
+
+    tic = time.perf_counter()
+    per_client = n_requests // n_clients
+    await asyncio.gather(*(run_client(k, per_client) for k in range(n_clients)))
+    elapsed = time.perf_counter() - tic
+    await server.close()
+
+    latencies.sort()
+    result = {"requests_per_s": len(latencies) / elapsed}
+    for q in (50, 99, 99.9):
+        index = min(len(latencies) - 1, int(q / 100 * len(latencies)))
+        result[f"p{q}_us"] = latencies[index] * 1e6
+    return result
+
+
+if __name__ == "__main__":
+    for depth in (1, 16, 256):
+        result = asyncio.run(load_test(depth=depth, n_requests=50_000))
+        print(
+            f"depth {depth:>3}: {result['requests_per_s']:,.0f} requests/s, "
+            f"p50 {result['p50_us']:,.0f} us, p99 {result['p99_us']:,.0f} us, "
+            f"p99.9 {result['p99.9_us']:,.0f} us"
+        )
@@ -0,0 +1,222 @@
+# This module contains functions to save and load WalletBook balances as
+# memory-mapped .npy snapshots, a class Checkpointer that keeps a snapshot up
+# to date by rewriting only the pages marked as changed, and a class
+# CheckpointedWalletBook that marks those pages on every write.
+
+import os
+
+import numpy as np
+
+from wallet_book import WalletBook
+
+PAGE_BYTES = 4096
+
+
+def save_snapshot(book, path):
+    """Write all balances of a WalletBook to a .npy file.
+
+    The file is written next to `path` and then renamed over it, so a crash
+    never leaves a half-written snapshot behind.
+
+    Parameters
+    ----------
+    book : WalletBook
+        The wallets to save.
+    path : str or path-like
+        Location of the snapshot file.
+    """
+    tmp_path = f"{os.fspath(path)}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, book.balances)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path, mode="r+"):
+    """Load a WalletBook whose balances are memory-mapped from a .npy file.
+
+    Nothing is read up front: pages are brought in by the operating system as
+    they are used, so loading takes about the same time for any number of
+    wallets.
+
+    Parameters
+    ----------
+    path : str or path-like
+        Location of the snapshot file.
+    mode : {"r+", "r", "c"}, optional
+        Memory-map mode. "r+" writes changes through to the file, "r" is
+        read-only and "c" is copy-on-write, by default "r+".
+
+    Returns
+    -------
+    WalletBook
+        A book backed directly by the file, without copying.
+    """
+    return WalletBook(np.load(path, mmap_mode=mode), copy=False)
+
+
+class Checkpointer:
+    """Keep a snapshot file in step with an in-memory WalletBook.
+
+    Writers `mark` the wallets they change, which sets bits in a bitmap of
+    dirty pages; a CheckpointedWalletBook does this on every write. Each
+    `checkpoint` copies only those pages into the memory-mapped snapshot and
+    flushes it, so its cost depends on how much changed and not on the number
+    of wallets. Pages line up with the PAGE_BYTES pages of the file, after the
+    .npy header, so each dirty page is one page write.
+
+    Parameters
+    ----------
+    book : WalletBook
+        The wallets to checkpoint.
+    path : str or path-like
+        Location of the snapshot file. A full snapshot is written first.
+
+    Attributes
+    ----------
+    item : str
+        The type of item, a "Checkpointer"
+    """
+
+    item = "Checkpointer"
+
+    def __init__(self, book, path):
+        """See help(Checkpointer)"""
+        self.book = book
+        self.path = path
+        save_snapshot(book, path)
+        self._snapshot = np.load(path, mmap_mode="r+")
+        itemsize = book.balances.itemsize
+        self._page = max(1, PAGE_BYTES // itemsize)
+        # balances that share the first file page with the header
+        self._offset = self._snapshot.offset % PAGE_BYTES // itemsize
+        self._dirty = np.zeros(-(-(self._offset + len(book)) // self._page), bool)
+
+    def mark(self, ids):
+        """Record that the wallets with these ids have changed."""
+        ids = np.asarray(ids, dtype=np.intp)
+        if ids.size and (ids.min() < 0 or ids.max() >= len(self.book)):
+            raise IndexError("wallet id out of range.")
+        self._dirty[(ids + self._offset) // self._page] = True
+
+    def mark_all(self):
+        """Record that any wallet may have changed."""
+        self._dirty[:] = True
+
+    def dirty_pages(self):
+        """Return the indices of the pages marked since the last checkpoint."""
+        return np.flatnonzero(self._dirty)
+
+    def checkpoint(self):
+        """Write the dirty pages to the snapshot and flush it to disk.
+
+        Returns
+        -------
+        int
+            The number of pages written.
+        """
+        pages = self.dirty_pages()
+        for page in pages.tolist():
+            lo = max(0, page * self._page - self._offset)
+            hi = (page + 1) * self._page - self._offset
+            self._snapshot[lo:hi] = self.book.balances[lo:hi]
+        if len(pages):
+            self._snapshot.flush()
+            self._dirty[:] = False
+        return len(pages)
+
+
+class CheckpointedWalletBook(WalletBook):
+    """A WalletBook that keeps a snapshot file in step with its balances.
+
+    Every write method marks the pages it touches before changing them, so
+    `checkpoint` always writes everything that changed since the last one.
+
+    Parameters
+    ----------
+    balances : array-like
+        Amount of starting cash for each wallet.
+    path : str or path-like
+        Location of the snapshot file. A full snapshot is written first.
+    dtype : data-type, optional
+        Data type of the balance array, by default float64.
+
+    Attributes
+    ----------
+    item : str
+        The type of item, a "CheckpointedWalletBook"
+    checkpointer : Checkpointer
+        Tracks the dirty pages and writes them to the snapshot.
+    """
+
+    item = "CheckpointedWalletBook"
+
+    def __init__(self, balances, path, dtype=np.float64):
+        """See help(CheckpointedWalletBook)"""
+        super().__init__(balances, dtype=dtype)
+        self.checkpointer = Checkpointer(self, path)
+
+    def checkpoint(self):
+        """Write the changed pages to disk, see `Checkpointer.checkpoint`."""
+        return self.checkpointer.checkpoint()
+
+    def _write(self, method, ids, *args):
+        """Mark the pages of a batch, then apply it with `method`."""
+        ids = np.asarray(ids, dtype=np.intp)
+        self.checkpointer.mark(ids)
+        return method(ids, *args)
+
+    def buy_items(self, ids, costs, numbers=1):
+        """Spend money from many wallets, see `WalletBook.buy_items`."""
+        return self._write(super().buy_items, ids, costs, numbers)
+
+    def sell_items(self, ids, costs, numbers=1):
+        """Sell items from many wallets, see `WalletBook.sell_items`."""
+        self._write(super().sell_items, ids, costs, numbers)
+
+    def apply(self, ids, costs, numbers=1, is_buy=True, out_balances=None):
+        """Apply a mixed batch in order, see `WalletBook.apply`."""
+        return self._write(super().apply, ids, costs, numbers, is_buy, out_balances)
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    n_wallets = 1_000_000
+    rng = np.random.default_rng(2021)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "balances.npy")
+        tic = time.perf_counter()
+        book = CheckpointedWalletBook(rng.uniform(0, 100, n_wallets), path)
+        print(f"full snapshot: {(time.perf_counter() - tic) * 1000:.1f} ms")
+
+        for n_writes in (10, 100, 1_000):
+            ids = rng.integers(0, n_wallets, n_writes)
+            book.sell_items(ids, rng.uniform(0, 10, n_writes))
+            book.checkout(ids[:10], np.arange(10), rng.uniform(0, 10, 10))
+            book.buy_items([n_wallets - 1], [1.0])
+            tic = time.perf_counter()
+            n_pages = book.checkpoint()
+            elapsed = (time.perf_counter() - tic) * 1000
+            print(
+                f"checkpoint after {n_writes:,} writes: {n_pages} of "
+                f"{len(book.checkpointer._dirty)} pages in {elapsed:.2f} ms"
+            )
+            assert np.array_equal(np.load(path, mmap_mode="r"), book.balances)
+
+        try:
+            book.checkpointer.mark([-1])
+        except IndexError:
+            pass
+        else:
+            raise AssertionError("marked a negative wallet id")
+
+        tic = time.perf_counter()
+        restored = load_snapshot(path, mode="r")
+        elapsed = (time.perf_counter() - tic) * 1000
+        print(f"restore {n_wallets:,} wallets: {elapsed:.2f} ms")
+        assert np.array_equal(restored.balances, book.balances)
+        del restored, book
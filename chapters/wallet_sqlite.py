@@ -0,0 +1,173 @@
+# This module contains a class SQLiteWalletStore that keeps wallet balances in
+# a SQLite database, so they are durable without an external database server.
+
+import sqlite3
+
+from wallet import Rejection, Wallet
+
+SCHEMA = "CREATE TABLE IF NOT EXISTS wallets (id INTEGER PRIMARY KEY, balance REAL)"
+INSERT = "INSERT INTO wallets (id, balance) VALUES (?, ?)"
+SELECT = "SELECT balance FROM wallets WHERE id = ?"
+UPDATE = "UPDATE wallets SET balance = ? WHERE id = ?"
+SPEND = "UPDATE wallets SET balance = balance - ? WHERE id = ? AND ? <= balance"
+EARN = "UPDATE wallets SET balance = balance + ? WHERE id = ?"
+
+
+class SQLiteWalletStore:
+    """Wallets stored in a SQLite database in WAL mode.
+
+    Single operations run as one small transaction each. `apply` runs a whole
+    batch of purchases and sales in one transaction and writes every changed
+    balance with a single `executemany`. SQL statements are constant strings,
+    so sqlite3 prepares each one once and reuses it.
+
+    Parameters
+    ----------
+    path : str or path-like
+        Location of the database file, or ":memory:".
+
+    Attributes
+    ----------
+    item : str
+        The type of item, a "SQLiteWalletStore"
+    """
+
+    item = "SQLiteWalletStore"
+
+    def __init__(self, path):
+        """See help(SQLiteWalletStore)"""
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.execute(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM wallets").fetchone()[0]
+
+    def __str__(self):
+        return f"A SQLiteWalletStore with {len(self)} wallets"
+
+    def close(self):
+        """Close the database connection."""
+        self._db.close()
+
+    def open_wallets(self, balances):
+        """Create wallets from a dict of wallet id to starting balance."""
+        with self._db:
+            self._db.execute("BEGIN")
+            self._db.executemany(INSERT, balances.items())
+
+    def balance(self, wallet_id):
+        """Return the current balance of a wallet."""
+        row = self._db.execute(SELECT, (wallet_id,)).fetchone()
+        if row is None:
+            raise KeyError(wallet_id)
+        return row[0]
+
+    def buy_item(self, wallet_id, cost, number=1):
+        """Spend money from a wallet, see `Wallet.buy_item`.
+
+        Raises
+        ------
+        InsufficientCashError
+            If the wallet does not have enough money to spend.
+        """
+        total = cost * number
+        if self._db.execute(SPEND, (total, wallet_id, total)).rowcount == 0:
+            raise Rejection(cost, number, self.balance(wallet_id)).error()
+
+    def sell_item(self, wallet_id, cost, number=1):
+        """Sell items and increase a wallet's balance, see `Wallet.sell_item`."""
+        if self._db.execute(EARN, (cost * number, wallet_id)).rowcount == 0:
+            raise KeyError(wallet_id)
+
+    def apply(self, transactions):
+        """Apply many purchases and sales in order, in one transaction.
+
+        Parameters
+        ----------
+        transactions : iterable of (str, int, number, int)
+            (action, wallet id, cost, number) of each transaction, where
+            action is "buy" or "sell".
+
+        Returns
+        -------
+        list of Rejection or None
+            None for each transaction that went through, and a Rejection for
+            each purchase that could not be afforded, see `Wallet.try_buy`.
+        """
+        transactions = list(transactions)
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            ids = {wallet_id for _, wallet_id, _, _ in transactions}
+            wallets = {wallet_id: Wallet(self.balance(wallet_id)) for wallet_id in ids}
+            results = []
+            for action, wallet_id, cost, number in transactions:
+                wallet = wallets[wallet_id]
+                if action == "buy":
+                    results.append(wallet.try_buy(cost, number))
+                elif action == "sell":
+                    wallet.sell_item(cost, number)
+                    results.append(None)
+                else:
+                    raise ValueError('action must be "buy" or "sell".')
+            self._db.executemany(
+                UPDATE, [(wallet.balance, key) for key, wallet in wallets.items()]
+            )
+        return results
+
+
+if __name__ == "__main__":
+    import os
+    import random
+    import tempfile
+    import time
+
+    from wallet import InsufficientCashError
+
+    n_wallets, n_ops = 1_000, 20_000
+    rng = random.Random(2021)
+    transactions = [
+        (rng.choice(["buy", "sell"]), rng.randrange(n_wallets), rng.randint(1, 20), 1)
+        for _ in range(n_ops)
+    ]
+
+    wallets = {i: Wallet(100) for i in range(n_wallets)}
+    tic = time.perf_counter()
+    for action, wallet_id, cost, number in transactions:
+        if action == "buy":
+            wallets[wallet_id].try_buy(cost, number)
+        else:
+            wallets[wallet_id].sell_item(cost, number)
+    print(f"in-memory Wallet: {n_ops / (time.perf_counter() - tic):,.0f} ops/s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for batch_size in (1, 100, 1_000, 10_000):
+            path = os.path.join(tmp, f"wallets-{batch_size}.db")
+            with SQLiteWalletStore(path) as store:
+                store.open_wallets({i: 100 for i in range(n_wallets)})
+                tic = time.perf_counter()
+                if batch_size == 1:
+                    for action, wallet_id, cost, number in transactions:
+                        if action == "buy":
+                            try:
+                                store.buy_item(wallet_id, cost, number)
+                            except InsufficientCashError:
+                                pass
+                        else:
+                            store.sell_item(wallet_id, cost, number)
+                else:
+                    for start in range(0, n_ops, batch_size):
+                        store.apply(transactions[start : start + batch_size])
+                elapsed = time.perf_counter() - tic
+                assert all(
+                    store.balance(i) == wallet.balance for i, wallet in wallets.items()
+                )
+            rate = n_ops / elapsed
+            print(f"SQLite, {batch_size:>6} per transaction: {rate:,.0f} ops/s")
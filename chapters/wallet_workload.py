@@ -0,0 +1,149 @@
+# This module contains a seeded generator of realistic wallet traffic for load
+# tests: Zipf-skewed wallet ids, bursts of activity, a mix of purchases and
+# sales and a tunable share of purchases that cannot be afforded.
+
+from collections import namedtuple
+
+import numpy as np
+
+# A chunk of traffic as parallel arrays:
+#     time : float64, seconds since the start of the workload.
+#     wallet : int64, wallet id of each event.
+#     is_buy : bool, True for purchases and False for sales.
+#     cost : float64, cost of the item in dollars, in whole cents.
+#     number : int64, number of items.
+Workload = namedtuple("Workload", ["time", "wallet", "is_buy", "cost", "number"])
+
+OVERSIZED_COST = 1e9
+
+
+def generate(
+    n_events,
+    n_wallets,
+    seed=2021,
+    zipf_s=1.1,
+    buy_ratio=0.6,
+    rejection_rate=0.05,
+    max_cost=50.0,
+    rate=1_000.0,
+    burst_fraction=0.05,
+    burst_factor=20.0,
+    chunk_size=10_000_000,
+):
+    """Generate wallet traffic in chunks.
+
+    The same arguments always give the same stream of chunks.
+
+    Parameters
+    ----------
+    n_events : int
+        Total number of events.
+    n_wallets : int
+        Number of wallets, with ids 0 to n_wallets - 1.
+    seed : int, optional
+        Seed of the random streams, by default 2021.
+    zipf_s : float, optional
+        Zipf exponent of wallet popularity, by default 1.1. The k-th most
+        popular wallet is picked with probability proportional to k**-zipf_s.
+        Popularity ranks are shuffled across wallet ids.
+    buy_ratio : float, optional
+        Share of events that are purchases, by default 0.6.
+    rejection_rate : float, optional
+        Share of purchases priced at OVERSIZED_COST, far above any realistic
+        balance, so that at least this share is rejected, by default 0.05.
+    max_cost : float, optional
+        Highest cost of an ordinary item, by default 50.0.
+    rate : float, optional
+        Average events per second outside bursts, by default 1,000.
+    burst_fraction : float, optional
+        Share of events that arrive in bursts, by default 0.05.
+    burst_factor : float, optional
+        How many times faster events arrive during a burst, by default 20.
+    chunk_size : int, optional
+        Most events per chunk, by default 10,000,000.
+
+    Yields
+    ------
+    Workload
+        The next chunk of events, in time order.
+    """
+    seeds = np.random.SeedSequence(seed)
+    setup, rng = (np.random.default_rng(s) for s in seeds.spawn(2))
+    cdf = np.cumsum(np.arange(1, n_wallets + 1, dtype=np.float64) ** -zipf_s)
+    cdf /= cdf[-1]
+    ranked_ids = setup.permutation(n_wallets)
+    burst_length = 1_000
+    start_time = 0.0
+
+    for lo in range(0, n_events, chunk_size):
+        n = min(chunk_size, n_events - lo)
+        wallet = ranked_ids[np.searchsorted(cdf, rng.random(n), side="right")]
+        is_buy = rng.random(n) < buy_ratio
+        cost = rng.integers(1, round(max_cost * 100) + 1, n) / 100
+        cost[is_buy & (rng.random(n) < rejection_rate)] = OVERSIZED_COST
+        number = rng.geometric(0.6, n)
+
+        # events arrive in runs of burst_length, and some runs are bursts
+        runs = -(-n // burst_length)
+        speed = np.where(rng.random(runs) < burst_fraction, burst_factor, 1.0)
+        gaps = rng.exponential(1 / rate, n) / np.repeat(speed, burst_length)[:n]
+        time = start_time + np.cumsum(gaps)
+        start_time = time[-1]
+        yield Workload(time, wallet, is_buy, cost, number)
+
+
+def rows(workload):
+    """Yield (action, wallet id, cost, number) tuples of a Workload.
+
+    This is the shape taken by SQLiteWalletStore.apply, for engines that
+    work one transaction at a time.
+    """
+    actions = np.where(workload.is_buy, "buy", "sell").tolist()
+    return zip(
+        actions,
+        workload.wallet.tolist(),
+        workload.cost.tolist(),
+        workload.number.tolist(),
+    )
+
+
+def save(path, workload):
+    """Save a Workload to an uncompressed .npz file."""
+    np.savez(path, **workload._asdict())
+
+
+def load(path):
+    """Load a Workload saved by `save`."""
+    with np.load(path) as data:
+        return Workload(*(data[name] for name in Workload._fields))
+
+
+if __name__ == "__main__":
+    import time
+
+    from wallet_book import WalletBook
+
+    n_events, n_wallets = 100_000_000, 1_000_000
+    tic = time.perf_counter()
+    total = 0
+    for chunk in generate(n_events, n_wallets):
+        total += len(chunk.wallet)
+    elapsed = time.perf_counter() - tic
+    print(f"generated {total:,} events in {elapsed:.1f}s ({total / elapsed:,.0f}/s)")
+
+    chunk = next(generate(2_000_000, n_wallets))
+    counts = np.bincount(chunk.wallet, minlength=n_wallets)
+    top = np.sort(counts)[::-1]
+    print(
+        f"busiest wallet {top[0]:,} events, top 1% of wallets "
+        f"{top[: n_wallets // 100].sum() / len(chunk.wallet):.0%} of traffic"
+    )
+
+    book = WalletBook(np.full(n_wallets, 100.0))
+    tic = time.perf_counter()
+    failed = book.apply(chunk.wallet, chunk.cost, chunk.number, chunk.is_buy)
+    elapsed = time.perf_counter() - tic
+    print(
+        f"WalletBook: {len(failed) / elapsed:,.0f} events/s, "
+        f"{failed.sum() / chunk.is_buy.sum():.1%} of purchases rejected"
+    )
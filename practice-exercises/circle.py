@@ -1,18 +1,98 @@
 import math
 
 class Circle:
-    """A circle with a radius r."""
+    """A circle with a radius r.
+
+    The area and circumference are computed on first use and cached until
+    the radius is assigned again.
+    """
+
+    __slots__ = ("_radius", "_area", "_circumference")
 
     def __init__(self, radius):
         self.radius = radius
 
+    @property
+    def radius(self):
+        return self._radius
+
+    @radius.setter
+    def radius(self, radius):
+        self._radius = radius
+        self._area = self._circumference = None
+
     def area(self):
         """Calculate the area of the circle."""
-        return math.pi * self.radius ** 2
+        if self._area is None:
+            self._area = math.pi * self._radius ** 2
+        return self._area
 
     def circumference(self):
         """Calculate the circumference of the circle."""
-        return 2.0 * math.pi * self.radius
+        if self._circumference is None:
+            self._circumference = 2.0 * math.pi * self._radius
+        return self._circumference
+
+    def __str__(self):
+        return f"A Circle with radius {self.radius}"
+
+
+class Sphere(Circle):
+    """A sphere with a radius r."""
+
+    __slots__ = ("_volume",)
+
+    @Circle.radius.setter
+    def radius(self, radius):
+        Circle.radius.fset(self, radius)
+        self._volume = None
+
+    def volume(self):
+        """Calculate the volume of the sphere."""
+        if self._volume is None:
+            self._volume = 4 / 3 * math.pi * self._radius ** 3
+        return self._volume
+
+    @classmethod
+    def from_circ(cls, circumference):
+        """Make an instance of Sphere from a circumference."""
+        radius = circumference / (2 * math.pi)
+        return cls(radius)
 
     def __str__(self):
-        return f"A Circle with radius {self.radius}"
\ No newline at end of file
+        return f"A Sphere with volume {self.volume():.2f}"
+
+
+if __name__ == "__main__":
+    import timeit
+    import tracemalloc
+
+    class PlainCircle:
+        """Circle as it was before caching, for comparison."""
+
+        def __init__(self, radius):
+            self.radius = radius
+
+        def area(self):
+            return math.pi * self.radius ** 2
+
+    circle = Sphere(3)
+    assert circle.area() == math.pi * 3 ** 2
+    circle.radius = 4
+    assert circle.area() == math.pi * 4 ** 2
+    assert circle.volume() == 4 / 3 * math.pi * 4 ** 3
+    assert str(Sphere.from_circ(6)) == "A Sphere with volume 3.65"
+
+    for cls in (PlainCircle, Circle):
+        shape = cls(3.7)
+        seconds = min(timeit.repeat(shape.area, number=1_000_000, repeat=5))
+        print(f"{cls.__name__}.area(): {seconds * 1000:.0f} ns per call")
+
+    for cls in (PlainCircle, Circle, Sphere):
+        tracemalloc.start()
+        shapes = [cls(float(r)) for r in range(100_000)]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        # don't count the list itself, only the instances
+        per_instance = (size - shapes.__sizeof__()) / len(shapes)
+        print(f"{cls.__name__}: {per_instance:.0f} bytes per instance")
@@ -0,0 +1,99 @@
+import math
+
+import numpy as np
+
+from circle import Circle, Sphere
+
+
+class CircleArray:
+    """Many circles whose radii live in one NumPy array.
+
+    Every method works on all circles at once and gives the same numbers as
+    calling the matching `Circle` method on each circle, up to float rounding.
+
+    Parameters
+    ----------
+    radii : array-like of number
+        The radius of each circle.
+    """
+
+    element = Circle
+
+    def __init__(self, radii):
+        self.radii = np.asarray(radii, dtype=np.float64)
+
+    @classmethod
+    def from_circles(cls, circles):
+        """Make an array from Circle objects."""
+        return cls([circle.radius for circle in circles])
+
+    def to_circles(self):
+        """Return a list with one Circle object per radius."""
+        return [self.element(radius) for radius in self.radii.tolist()]
+
+    def area(self):
+        """Calculate the area of every circle."""
+        return math.pi * self.radii ** 2
+
+    def circumference(self):
+        """Calculate the circumference of every circle."""
+        return 2.0 * math.pi * self.radii
+
+    def __len__(self):
+        return len(self.radii)
+
+    def __getitem__(self, index):
+        radii = self.radii[index]
+        if radii.ndim == 0:
+            return self.element(radii.item())
+        return type(self)(radii)
+
+    def __str__(self):
+        return f"A {type(self).__name__} of {len(self)} circles"
+
+
+class SphereArray(CircleArray):
+    """Many spheres whose radii live in one NumPy array, see CircleArray."""
+
+    element = Sphere
+
+    def volume(self):
+        """Calculate the volume of every sphere."""
+        return 4 / 3 * math.pi * self.radii ** 3
+
+    @classmethod
+    def from_circ(cls, circumferences):
+        """Make an array of spheres from their circumferences."""
+        return cls(np.asarray(circumferences, dtype=np.float64) / (2 * math.pi))
+
+    def __str__(self):
+        return f"A SphereArray of {len(self)} spheres"
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(2021)
+    radii = rng.uniform(0, 100, 1_000_000)
+    spheres = SphereArray(radii)
+    objects = spheres.to_circles()
+
+    # NumPy and the math library round powers differently in the last bit
+    for name in ("area", "circumference", "volume"):
+        expected = [getattr(sphere, name)() for sphere in objects]
+        assert np.allclose(getattr(spheres, name)(), expected, rtol=1e-15, atol=0)
+    circs = spheres.circumference()
+    expected = [Sphere.from_circ(c).radius for c in circs.tolist()]
+    assert np.allclose(SphereArray.from_circ(circs).radii, expected, rtol=1e-15, atol=0)
+
+    for name in ("area", "circumference", "volume"):
+        tic = time.perf_counter()
+        loop = [getattr(sphere, name)() for sphere in objects]
+        loop_time = time.perf_counter() - tic
+        tic = time.perf_counter()
+        getattr(spheres, name)()
+        array_time = time.perf_counter() - tic
+        print(
+            f"{name}: objects {loop_time:.3f}s, SphereArray {array_time:.4f}s "
+            f"({loop_time / array_time:,.0f}x)"
+        )
@@ -0,0 +1,174 @@
+import numpy as np
+
+
+def _expand(starts, counts):
+    """Concatenate the ranges starts[i] : starts[i] + counts[i]."""
+    ends = np.cumsum(counts)
+    total = ends[-1] if len(ends) else 0
+    return np.repeat(starts - ends + counts, counts) + np.arange(total)
+
+
+class CircleGrid:
+    """A uniform grid over many circles for finding those that contain a point.
+
+    Every circle is filed under each grid cell its bounding box overlaps, and
+    the circles of each cell are stored next to each other. A point is only
+    tested against the circles of its own cell, so query time depends on how
+    many circles are near the point, not on how many there are in total.
+
+    Parameters
+    ----------
+    centers : array-like of shape (n, 2)
+        The (x, y) center of each circle.
+    radii : array-like of shape (n,)
+        The radius of each circle.
+    cell_size : float, optional
+        Width of a grid cell. By default the largest of the median circle
+        diameter, the side of a square holding one circle on average and the
+        longer side of the bounding box divided by sqrt(n), so there are at
+        most about as many cells as circles.
+    """
+
+    def __init__(self, centers, radii, cell_size=None):
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        radii = np.asarray(radii, dtype=np.float64)
+        if len(radii) != len(centers):
+            raise ValueError("centers and radii must have the same length.")
+        if len(radii) and radii.min() < 0:
+            raise ValueError("radii can't be negative.")
+        x, y = centers[:, 0], centers[:, 1]
+        if len(radii):
+            self.origin = np.array([(x - radii).min(), (y - radii).min()])
+            extent = np.array([(x + radii).max(), (y + radii).max()]) - self.origin
+        else:
+            self.origin = extent = np.zeros(2)
+        if cell_size is None:
+            n = max(len(radii), 1)
+            # the last term keeps the grid at most about sqrt(n) cells wide in
+            # each direction, even when all circles lie along a line
+            cell_size = max(
+                2 * np.median(radii) if len(radii) else 0,
+                np.sqrt(extent.prod() / n),
+                extent.max() / np.sqrt(n),
+            ) or 1.0
+        elif cell_size <= 0:
+            raise ValueError("cell_size must be positive.")
+        self.n_circles = len(radii)
+        self.cell_size = cell_size
+        self.shape = (extent // cell_size).astype(np.intp) + 1
+
+        # cells covered by each circle's bounding box
+        low = self._cell(x - radii, y - radii)
+        high = self._cell(x + radii, y + radii)
+        width = high[0] - low[0] + 1
+        counts = width * (high[1] - low[1] + 1)
+        owner = np.repeat(np.arange(len(radii)), counts)
+        j = _expand(np.zeros(len(radii), dtype=np.intp), counts)
+        cells = (low[1][owner] + j // width[owner]) * self.shape[0]
+        cells += low[0][owner] + j % width[owner]
+
+        order = np.argsort(cells, kind="stable")
+        self.ids = owner[order]
+        per_cell = np.bincount(cells, minlength=self.shape.prod())
+        self.offsets = np.r_[0, np.cumsum(per_cell)]
+        # copies in cell order, so a cell's circles are contiguous in memory
+        self._x, self._y, self._r2 = x[self.ids], y[self.ids], radii[self.ids] ** 2
+
+    @classmethod
+    def from_circles(cls, centers, circles, cell_size=None):
+        """Make a grid from Circle objects and their (x, y) centers."""
+        return cls(centers, [circle.radius for circle in circles], cell_size)
+
+    def __len__(self):
+        return self.n_circles
+
+    def _cell(self, x, y):
+        """Return the column and row of the cells holding points (x, y)."""
+        column = np.floor((x - self.origin[0]) / self.cell_size).astype(np.intp)
+        row = np.floor((y - self.origin[1]) / self.cell_size).astype(np.intp)
+        return column, row
+
+    def query(self, points):
+        """Find the circles that contain each of many points.
+
+        A point on the edge of a circle counts as inside it.
+
+        Parameters
+        ----------
+        points : array-like of shape (m, 2)
+            The (x, y) points to look up.
+
+        Returns
+        -------
+        point_ids : numpy.ndarray of int
+            Position of the point in `points`, for each match.
+        circle_ids : numpy.ndarray of int
+            Position of the circle in the grid's input, for each match.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        column, row = self._cell(points[:, 0], points[:, 1])
+        inside = (column >= 0) & (column < self.shape[0])
+        inside &= (row >= 0) & (row < self.shape[1])
+        point_ids = np.flatnonzero(inside)
+        cells = row[point_ids] * self.shape[0] + column[point_ids]
+        starts = self.offsets[cells]
+        counts = self.offsets[cells + 1] - starts
+        entries = _expand(starts, counts)
+        point_ids = np.repeat(point_ids, counts)
+        dx = self._x[entries] - points[point_ids, 0]
+        dy = self._y[entries] - points[point_ids, 1]
+        hit = dx * dx + dy * dy <= self._r2[entries]
+        return point_ids[hit], self.ids[entries[hit]]
+
+    def contains(self, x, y):
+        """Return the ids of the circles that contain the point (x, y)."""
+        return np.sort(self.query([[x, y]])[1])
+
+
+if __name__ == "__main__":
+    import time
+
+    from circle import Circle
+
+    rng = np.random.default_rng(2021)
+
+    # check against testing every circle
+    centers = rng.uniform(0, 100, (2_000, 2))
+    circles = [Circle(r) for r in rng.uniform(0, 5, 2_000).tolist()]
+    grid = CircleGrid.from_circles(centers, circles)
+    radii = np.array([circle.radius for circle in circles])
+    for x, y in rng.uniform(-10, 110, (500, 2)).tolist():
+        distance = np.hypot(centers[:, 0] - x, centers[:, 1] - y)
+        brute = np.flatnonzero(distance <= radii)
+        assert np.array_equal(grid.contains(x, y), brute)
+
+    # points on a line and zero radii must not blow up the default grid
+    grid = CircleGrid([[0, 0], [1e6, 0]], [0, 0])
+    assert grid.shape.prod() <= 9 and grid.contains(1e6, 0).tolist() == [1]
+    assert len(CircleGrid([[5, 5]] * 3, [0, 0, 0]).contains(5, 5)) == 3
+
+    # same density of circles, growing total: query time should stay flat
+    n_points = 200_000
+    for n_circles in (10_000, 100_000, 1_000_000, 4_000_000):
+        side = np.sqrt(n_circles) * 10
+        centers = rng.uniform(0, side, (n_circles, 2))
+        radii = rng.uniform(0, 5, n_circles)
+        tic = time.perf_counter()
+        grid = CircleGrid(centers, radii)
+        build_time = time.perf_counter() - tic
+        points = rng.uniform(0, side, (n_points, 2))
+        tic = time.perf_counter()
+        point_ids, _ = grid.query(points)
+        query_time = time.perf_counter() - tic
+        line = (
+            f"{n_circles:>9,} circles: build {build_time:.2f}s, "
+            f"{query_time / n_points * 1e9:,.0f} ns per point query "
+            f"({len(point_ids) / n_points:.2f} hits per point)"
+        )
+        if n_circles <= 100_000:
+            tic = time.perf_counter()
+            for x, y in points[:100].tolist():
+                np.flatnonzero(np.hypot(centers[:, 0] - x, centers[:, 1] - y) <= radii)
+            brute_time = (time.perf_counter() - tic) / 100
+            line += f", testing every circle {brute_time * 1e9:,.0f} ns"
+        print(line)